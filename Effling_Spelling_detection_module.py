@@ -1,9 +1,43 @@
-from flask import Flask, request, jsonify, render_template_string
-from typing import List, Dict, Optional
+from flask import Flask, Response, request, jsonify, render_template_string, stream_with_context
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
+from werkzeug.serving import make_server
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import Mapping, Sequence
+from concurrent.futures import BrokenExecutor, CancelledError, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from urllib.parse import parse_qsl
+from multiprocessing.managers import BaseManager
+import argparse
+import asyncio
+import atexit
+import bisect
+import codecs
+import functools
+import gc
+import hashlib
+import heapq
+import itertools
 import jellyfish
+import json
 import math
+import mmap
+import multiprocessing
+import os
+import queue
+import random
+import re
+import secrets
+import signal
+import socket
+import sqlite3
+import struct
+import sys
 import time
 import threading
+import tracemalloc
+import unicodedata
+import urllib.error
+import urllib.request
 import webbrowser
 
 app = Flask(__name__)
@@ -17,8 +51,6 @@ HI_WORDS = [
     "सेब","बिल्ली","कुत्ता","घर","माता","पिता","खेल","किताब","स्कूल","फूल","गाय","सूरज","चाँद","नदी","आनंद","खुश","बच्चा","मित्र","दोस्त","सफर","पेड़","पत्ता","पानी","धरती","आसमान","पक्षी","फल","सब्जी","बाजार","शहर","गांव","सड़क","रेल","बस","गाड़ी","खिलौना","मैदान","कहानी","खेलना","पढ़ना","लिखना","सुनना","बोलना","मदद","साझा","मुस्कान","अच्छा","साफ","सुंदर","ईमानदार","दयालु","सच्चा","सूरजमुखी","बारिश","ठंड","गर्मी","वसंत","पतझड़","आशा","विश्व","काम","समय","दोस्ताना","विद्यालय","शिक्षक","विद्यार्थी","पेंसिल","कलम","रबर","किताब","बैग","डेस्क","बेंच","ब्लैकबोर्ड","चॉक","संख्या","रंग","आकार","जानवर","पंछी","फल","सब्ज़ी","शहर","गांव","नदी","बगीचा","पार्क","कुत्ता","बिल्ली","शेर","हाथी","बंदर","सिंह","मोर","तोता","खरगोश","खाना","दूध","पानी","दोस्ती","परिवार","भाई","बहन","खुशी","आनंद","सपना","सुबह","शाम","दिन","रात","आज","कल","कलमदान","कक्षा","कापी","खिड़की","दरवाज़ा","कमरा","घड़ी","समझ","सीखना","सुनना","पढ़ाई","खेलकूद","सफाई","स्वास्थ्य","प्रकृति","जीवन","प्रेम","ईश्वर","सत्य","धैर्य","सम्मान","ईमान","भोजन","फल","दूध","पानी","वातावरण","पशु","पक्षी","मनुष्य","मित्रता","संगीत","चित्र","नृत्य","गीत","कविता",
 ]
 
-VOCAB: Dict[str, Dict] = {}
-
 def age_level_for(word: str) -> str:
     l = len(word)
     if l <= 3:
@@ -27,40 +59,56 @@ def age_level_for(word: str) -> str:
         return "5-6"
     return "7-8"
 
-for w in EN_WORDS:
-    wl = w.lower()
-    VOCAB[wl] = {
-        "lang": "english",
-        "phonetic": jellyfish.metaphone(wl) or "",
-        "age_level": age_level_for(wl),
-        "difficulty": 1 if len(wl) <= 4 else (2 if len(wl) <= 7 else 4),
-        "category": "general",
-        "frequency": "high",
-        "example_sentence": f"I see a {wl}",
-        "audio_pronunciation": None,
-        "image_reference": None,
-        "common_mistakes": [],
-        "teaching_tips": None
-    }
+EXAMPLE_TEMPLATES = {"english": "I see a {word}", "hindi": "यह एक {word} है"}
 
-for w in HI_WORDS:
-    VOCAB[w] = {
-        "lang": "hindi",
-        "phonetic": "",
-        "age_level": age_level_for(w),
-        "difficulty": 1 if len(w) <= 3 else (2 if len(w) <= 6 else 4),
-        "category": "general",
-        "frequency": "high",
-        "example_sentence": f"यह एक {w} है",
-        "audio_pronunciation": None,
-        "image_reference": None,
-        "common_mistakes": [],
-        "teaching_tips": None
-    }
+def build_builtin_vocab() -> Dict[str, Dict]:
+    data: Dict[str, Dict] = {}
+    for w in EN_WORDS:
+        wl = w.lower()
+        data[wl] = {
+            "lang": "english",
+            "phonetic": jellyfish.metaphone(wl) or "",
+            "age_level": age_level_for(wl),
+            "difficulty": 1 if len(wl) <= 4 else (2 if len(wl) <= 7 else 4),
+            "category": "general",
+            "frequency": "high",
+            "example_sentence": EXAMPLE_TEMPLATES["english"].format(word=wl),
+            "audio_pronunciation": None,
+            "image_reference": None,
+            "common_mistakes": [],
+            "teaching_tips": None
+        }
+
+    for w in HI_WORDS:
+        data[w] = {
+            "lang": "hindi",
+            "phonetic": "",
+            "age_level": age_level_for(w),
+            "difficulty": 1 if len(w) <= 3 else (2 if len(w) <= 6 else 4),
+            "category": "general",
+            "frequency": "high",
+            "example_sentence": EXAMPLE_TEMPLATES["hindi"].format(word=w),
+            "audio_pronunciation": None,
+            "image_reference": None,
+            "common_mistakes": [],
+            "teaching_tips": None
+        }
 
-for k in ["apple", "phone", "elephant", "beautiful"]:
-    if k in VOCAB:
-        VOCAB[k]["common_mistakes"] = [{"incorrect": "aple" if k=="apple" else "fone" if k=="phone" else "elefant", "error_type":"common"}]
+    for k in ["apple", "phone", "elephant", "beautiful"]:
+        if k in data:
+            data[k]["common_mistakes"] = [{"incorrect": "aple" if k=="apple" else "fone" if k=="phone" else "elefant", "error_type":"common"}]
+    return data
+
+def read_vocabulary_source(path: str) -> Dict[str, Dict]:
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    if not isinstance(data, dict) or not all(isinstance(meta, dict) for meta in data.values()):
+        raise ValueError(f"{path}: expected a JSON object mapping words to metadata")
+    return data
+
+VOCAB_FILE = os.environ.get("EFFLING_VOCAB_FILE")
+VOCAB_SOURCE = os.environ.get("EFFLING_VOCAB_SOURCE")
+VOCAB: Dict[str, Dict] = {} if VOCAB_FILE else read_vocabulary_source(VOCAB_SOURCE) if VOCAB_SOURCE else build_builtin_vocab()
 
 
 def damerau_levenshtein(a: str, b: str) -> int:
@@ -95,21 +143,669 @@ def damerau_levenshtein(a: str, b: str) -> int:
         da[a[i - 1]] = i
     return dp[len_a + 1][len_b + 1]
 
+def damerau_levenshtein_bounded(a: str, b: str, max_distance: int) -> int:
+    a = a or ""
+    b = b or ""
+    len_a = len(a)
+    len_b = len(b)
+    cap = max_distance + 1
+    if abs(len_a - len_b) > max_distance:
+        return cap
+    if a == b:
+        return 0
+    INF = len_a + len_b + cap
+    depth = max_distance + 3
+    blank = [INF] * (len_b + 2)
+    rows = [list(blank) for _ in range(depth)]
+    first = rows[1]
+    for j in range(len_b + 1):
+        first[j + 1] = j
+    da = {}
+    for i in range(1, len_a + 1):
+        prev = rows[i % depth]
+        cur = rows[(i + 1) % depth]
+        cur[:] = blank
+        cur[1] = i
+        lo = max(1, i - max_distance)
+        hi = min(len_b, i + max_distance)
+        ca = a[i - 1]
+        db = 0
+        row_min = cur[1] if lo == 1 else INF
+        for j in range(lo, hi + 1):
+            cb = b[j - 1]
+            i1 = da.get(cb, 0)
+            j1 = db
+            cost = 0 if ca == cb else 1
+            if cost == 0:
+                db = j
+            v = prev[j] + cost
+            t = cur[j] + 1
+            if t < v:
+                v = t
+            t = prev[j + 1] + 1
+            if t < v:
+                v = t
+            if i1 and j1 and i - i1 <= max_distance:
+                t = rows[i1 % depth][j1] + (i - i1 - 1) + 1 + (j - j1 - 1)
+                if t < v:
+                    v = t
+            cur[j + 1] = v
+            if v < row_min:
+                row_min = v
+        if row_min > max_distance:
+            return cap
+        da[ca] = i
+    return min(rows[(len_a + 1) % depth][len_b + 1], cap)
+
+_native_damerau_levenshtein = getattr(jellyfish, "damerau_levenshtein_distance", None)
+
+def edit_distance(a: str, b: str) -> int:
+    a = a or ""
+    b = b or ""
+    if _native_damerau_levenshtein is not None and a.isascii() and b.isascii():
+        return _native_damerau_levenshtein(a, b)
+    return damerau_levenshtein(a, b)
+
+def damerau_levenshtein_batch(query: str, candidates: List[str], max_distance: Optional[int] = None) -> List[int]:
+    query = query or ""
+    if max_distance is None:
+        return [edit_distance(query, c) for c in candidates]
+    cap = max_distance + 1
+    n = len(query)
+    native = _native_damerau_levenshtein if query.isascii() else None
+    out = []
+    for c in candidates:
+        if abs(len(c) - n) > max_distance:
+            out.append(cap)
+        elif native is not None and c.isascii():
+            out.append(min(native(query, c), cap))
+        else:
+            out.append(damerau_levenshtein_bounded(query, c, max_distance))
+    return out
+
 def phonetic_code(word: str) -> str:
     try:
         return jellyfish.metaphone(word) or ""
     except Exception:
         return ""
 
+def latin_key(encode):
+    def key(word: str) -> str:
+        if not word or not word.isascii() or not any(ch.isalpha() for ch in word):
+            return ""
+        try:
+            return encode(word) or ""
+        except Exception:
+            return ""
+    return key
+
+DEVANAGARI_FOLD = {
+    "ख": "क", "घ": "ग", "छ": "च", "झ": "ज", "ठ": "ट", "ढ": "ड", "थ": "त", "ध": "द", "फ": "प", "भ": "ब",
+    "श": "स", "ष": "स", "ण": "न", "ङ": "ं", "ञ": "ं", "ँ": "ं",
+    "अ": "a", "आ": "a", "ा": "", "इ": "i", "ई": "i", "ि": "i", "ी": "i", "उ": "u", "ऊ": "u", "ु": "u", "ू": "u",
+    "ए": "e", "ऐ": "e", "े": "e", "ै": "e", "ओ": "o", "औ": "o", "ो": "o", "ौ": "o", "ऋ": "r", "ृ": "r",
+    "़": "", "्": "", "ः": "", "\u200c": "", "\u200d": "",
+}
+
+def devanagari_key(word: str) -> str:
+    if not word or not any("\u0900" <= ch <= "\u097f" for ch in word):
+        return ""
+    out = []
+    for ch in unicodedata.normalize("NFD", word):
+        ch = DEVANAGARI_FOLD.get(ch, ch)
+        if ch and (not out or out[-1] != ch):
+            out.append(ch)
+    return "".join(out)
+
+PHONETIC_KEYS = {
+    "english": {"metaphone": (latin_key(jellyfish.metaphone), 2), "nysiis": (latin_key(jellyfish.nysiis), 1), "soundex": (latin_key(jellyfish.soundex), 1)},
+    "hindi": {"devanagari": (devanagari_key, 1)},
+}
+
+PHONETIC_CONSENSUS = 0.5
+
+def phonetic_keys(word: str, language: Optional[str]) -> Dict[str, str]:
+    found = {}
+    for name, (key, _) in PHONETIC_KEYS.get(language, {}).items():
+        code = key(word)
+        if code:
+            found[name] = code
+    return found
+
+def phonetic_weight(language: Optional[str], name: str) -> float:
+    keys = PHONETIC_KEYS[language]
+    return keys[name][1] / sum(weight for _, weight in keys.values())
+
+VIRAMA = "\u094d"
+JOINERS = "\u200c\u200d"
+CLUSTER_BASE = 0xF0000
+CLUSTER_CAPACITY = 0xFFFE
+CLUSTER_UNKNOWN = "\U0010fffd"
+
+@functools.lru_cache(maxsize=65536)
+def grapheme_clusters(text: str) -> Tuple[str, ...]:
+    if text.isascii():
+        return tuple(text)
+    clusters: List[str] = []
+    for ch in text:
+        if clusters and (unicodedata.category(ch) in ("Mn", "Mc", "Me") or ch in JOINERS or (clusters[-1].rstrip("\u200d").endswith(VIRAMA) and unicodedata.category(ch) == "Lo")):
+            clusters[-1] += ch
+        else:
+            clusters.append(ch)
+    return tuple(clusters)
+
+def cluster_offsets(clusters: Sequence[str]) -> List[int]:
+    offsets = [0]
+    for c in clusters:
+        offsets.append(offsets[-1] + len(c))
+    return offsets
+
+class ClusterAlphabet:
+    def __init__(self, clusters: Sequence[str] = ()):
+        self.ids: Dict[str, int] = {}
+        self.clusters: List[str] = []
+        for c in clusters:
+            self.intern(c)
+
+    def intern(self, cluster: str) -> str:
+        code = self.ids.get(cluster)
+        if code is None:
+            if len(self.clusters) >= CLUSTER_CAPACITY:
+                raise ValueError(f"more than {CLUSTER_CAPACITY} distinct grapheme clusters")
+            code = self.ids[cluster] = len(self.clusters)
+            self.clusters.append(cluster)
+        return chr(CLUSTER_BASE + code)
+
+    def encode(self, text: str, intern: bool = False) -> str:
+        if text.isascii():
+            return text
+        out = []
+        for c in grapheme_clusters(text):
+            if len(c) == 1 and ord(c) < CLUSTER_BASE:
+                out.append(c)
+            elif intern:
+                out.append(self.intern(c))
+            else:
+                code = self.ids.get(c)
+                out.append(CLUSTER_UNKNOWN if code is None else chr(CLUSTER_BASE + code))
+        return "".join(out)
+
+INDEX_MAX_DISTANCE = 2
+
+def expired(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.monotonic() >= deadline
+
+def delete_variants(word: str, max_distance: int) -> set:
+    out = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        nxt = set()
+        for w in frontier:
+            for i in range(len(w)):
+                nxt.add(w[:i] + w[i + 1:])
+        out |= nxt
+        frontier = nxt
+    return out
+
+class CandidateIndex:
+    def __init__(self, max_distance: int = INDEX_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.keys: List[str] = []
+        self.order: Dict[str, int] = {}
+        self.by_length: Dict[int, List[str]] = {}
+        self.longest = 0
+
+    def add(self, key: str) -> bool:
+        if key in self.order:
+            return False
+        self.order[key] = len(self.keys)
+        self.keys.append(key)
+        self.by_length.setdefault(len(key), []).append(key)
+        self.longest = max(self.longest, len(key))
+        self._insert(key)
+        return True
+
+    def _insert(self, key: str):
+        pass
+
+    def _limit(self, max_distance: Optional[int]) -> int:
+        limit = self.max_distance if max_distance is None else max_distance
+        if limit > self.max_distance:
+            raise ValueError(f"index built for max_distance={self.max_distance}, got {limit}")
+        return limit
+
+    def search(self, key: str, max_distance: Optional[int] = None) -> Dict[str, int]:
+        limit = self._limit(max_distance)
+        n = len(key)
+        near = [k for length in range(max(0, n - limit), n + limit + 1) for k in self.by_length.get(length, ())]
+        return {k: d for k, d in zip(near, damerau_levenshtein_batch(key, near, limit)) if d <= limit}
+
+    def nearest(self, key: str, deadline: Optional[float] = None) -> Optional[Tuple[str, int]]:
+        n = len(key)
+        best = None
+        best_d = math.inf
+        best_o = math.inf
+        for length in sorted(self.by_length, key=lambda length: abs(length - n)):
+            gap = abs(length - n)
+            if gap > best_d or (best is not None and expired(deadline)):
+                break
+            for k in self.by_length[length]:
+                o = self.order[k]
+                if gap == best_d and o > best_o:
+                    break
+                d = edit_distance(key, k) if best is None else damerau_levenshtein_bounded(key, k, best_d)
+                if d < best_d or (d == best_d and o < best_o):
+                    best, best_d, best_o = k, d, o
+        return (best, best_d) if best is not None else None
+
+class DeletionIndex(CandidateIndex):
+    def __init__(self, max_distance: int = INDEX_MAX_DISTANCE):
+        super().__init__(max_distance)
+        self.deletes: Dict[str, List[str]] = {}
+
+    def _insert(self, key: str):
+        for d in delete_variants(key, self.max_distance):
+            self.deletes.setdefault(d, []).append(key)
+
+    def search(self, key: str, max_distance: Optional[int] = None) -> Dict[str, int]:
+        limit = self._limit(max_distance)
+        if len(key) > self.longest + limit:
+            return {}
+        seen = {}
+        for d in delete_variants(key, limit):
+            for k in self.deletes.get(d, ()):
+                seen[k] = None
+        near = list(seen)
+        return {k: d for k, d in zip(near, damerau_levenshtein_batch(key, near, limit)) if d <= limit}
+
+class BKTree(CandidateIndex):
+    def __init__(self, max_distance: int = INDEX_MAX_DISTANCE):
+        super().__init__(max_distance)
+        self.root = None
+
+    def _insert(self, key: str):
+        if self.root is None:
+            self.root = (key, {})
+            return
+        node = self.root
+        while True:
+            d = edit_distance(key, node[0])
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = (key, {})
+                return
+            node = child
+
+    def search(self, key: str, max_distance: Optional[int] = None) -> Dict[str, int]:
+        limit = self._limit(max_distance)
+        out = {}
+        stack = [self.root] if self.root else []
+        while stack:
+            k, children = stack.pop()
+            d = edit_distance(key, k)
+            if d <= limit:
+                out[k] = d
+            for cd, child in children.items():
+                if d - limit <= cd <= d + limit:
+                    stack.append(child)
+        return out
+
+    def nearest(self, key: str, deadline: Optional[float] = None) -> Optional[Tuple[str, int]]:
+        best = None
+        best_d = math.inf
+        stack = [self.root] if self.root else []
+        while stack and (best is None or not expired(deadline)):
+            k, children = stack.pop()
+            d = edit_distance(key, k)
+            if d < best_d or (d == best_d and self.order[k] < self.order[best]):
+                best, best_d = k, d
+            for cd, child in children.items():
+                if d - best_d <= cd <= d + best_d:
+                    stack.append(child)
+        return (best, best_d) if best is not None else None
+
+INDEX_STRATEGIES = {"brute": CandidateIndex, "symdel": DeletionIndex, "bktree": BKTree}
+
+FREQUENCY_RANK = {"high": 0, "medium": 1, "low": 2}
+AGE_LEVELS = ("3-4", "5-6", "7-8")
+PREFIX_MEMO_LENGTH = 2
+PREFIX_MEMO_SIZE = 10
+
+def memoizable(prefix: str, age_level: Optional[str], k: int, matched: int) -> bool:
+    return matched > 0 and len(prefix) <= PREFIX_MEMO_LENGTH and k <= PREFIX_MEMO_SIZE and (age_level is None or age_level in AGE_LEVELS)
+
+class PrefixIndex:
+    def __init__(self, entries: List[Tuple[str, str]]):
+        entries = sorted(entries)
+        self.keys: List[str] = [k for k, _ in entries]
+        self.words: List[str] = [w for _, w in entries]
+        self.memo: Dict[Tuple[str, Optional[str]], List[str]] = {}
+
+    def add(self, key: str, word: str):
+        i = bisect.bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.words.insert(i, word)
+        self.memo.clear()
+
+    def span(self, prefix: str, lo: int = 0, hi: Optional[int] = None) -> Tuple[int, int]:
+        hi = len(self.keys) if hi is None else hi
+        start = bisect.bisect_left(self.keys, prefix, lo, hi)
+        return start, bisect.bisect_left(self.keys, prefix + "\U0010ffff", start, hi)
+
+    def top(self, prefix: str, k: int, rank, age_level: Optional[str] = None, lo: int = 0, hi: Optional[int] = None) -> List[str]:
+        memo_key = (prefix, age_level)
+        if k <= PREFIX_MEMO_SIZE and memo_key in self.memo:
+            return self.memo[memo_key][:k]
+        start, end = self.span(prefix, lo, hi)
+        if memoizable(prefix, age_level, k, end - start):
+            self.memo[memo_key] = heapq.nsmallest(PREFIX_MEMO_SIZE, self.words[start:end], key=rank)
+            return self.memo[memo_key][:k]
+        return heapq.nsmallest(k, self.words[start:end], key=rank)
+
+RICH_DEFAULTS = {"example_sentence": None, "audio_pronunciation": None, "image_reference": None, "common_mistakes": None, "teaching_tips": None}
+STANDARD_FIELDS = ("lang", "phonetic", "age_level", "difficulty", "category", "frequency") + tuple(RICH_DEFAULTS)
+ENUM_FIELDS = ("lang", "age_level", "category", "frequency")
+
+class WordRecord(Mapping):
+    __slots__ = ("_store", "_id", "word")
+
+    def __init__(self, store: "CompactWordStore", word_id: int):
+        self._store = store
+        self._id = word_id
+        self.word = store.words[word_id]
+
+    def __getitem__(self, key: str):
+        store = self._store
+        extras = store.extras.get(self._id)
+        if extras is not None:
+            if key in extras and key != "_keys":
+                return extras[key]
+            if "_keys" in extras and key not in extras["_keys"]:
+                raise KeyError(key)
+        if key in ENUM_FIELDS:
+            return store.enums[key][store.columns[key][self._id]]
+        if key == "difficulty":
+            value = store.difficulty[self._id]
+            return None if value < 0 else value
+        if key == "phonetic":
+            return store.phonetic[self._id]
+        if key == "example_sentence":
+            template = EXAMPLE_TEMPLATES.get(self["lang"])
+            return template.format(word=self.word) if template else None
+        if key == "common_mistakes":
+            return []
+        if key in RICH_DEFAULTS:
+            return None
+        raise KeyError(key)
+
+    def __iter__(self):
+        extras = self._store.extras.get(self._id)
+        if extras is not None and "_keys" in extras:
+            return iter(extras["_keys"])
+        return iter(STANDARD_FIELDS)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"WordRecord({self.word!r}, {dict(self)!r})"
+
+class CompactWordStore:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.words: List[str] = []
+        self.enums: Dict[str, List] = {f: [] for f in ENUM_FIELDS}
+        self._enum_ids: Dict[str, Dict] = {f: {} for f in ENUM_FIELDS}
+        self.columns: Dict[str, array] = {f: array("H") for f in ENUM_FIELDS}
+        self.difficulty = array("h")
+        self.frequency_rank = array("B")
+        self.phonetic: List[str] = []
+        self.extras: Dict[int, Dict] = {}
+
+    def _intern(self, field: str, value) -> int:
+        ids = self._enum_ids[field]
+        found = ids.get((type(value), value))
+        if found is None:
+            found = ids[(type(value), value)] = len(self.enums[field])
+            self.enums[field].append(sys.intern(value) if isinstance(value, str) else value)
+        return found
+
+    def __setitem__(self, word: str, meta: Mapping):
+        word_id = self.ids.get(word)
+        fresh = word_id is None
+        if fresh:
+            word_id = self.ids[word] = len(self.words)
+            self.words.append(word)
+        extras = {k: v for k, v in meta.items() if k not in STANDARD_FIELDS}
+        if tuple(meta) != STANDARD_FIELDS:
+            extras["_keys"] = tuple(meta)
+        for field in ENUM_FIELDS:
+            value = meta.get(field)
+            try:
+                code = self._intern(field, value)
+            except TypeError:
+                extras[field] = value
+                code = 0 if self.enums[field] else self._intern(field, None)
+            self._set(self.columns[field], word_id, code, fresh)
+        difficulty = meta.get("difficulty")
+        fits = type(difficulty) is int and 0 <= difficulty < 32768
+        if difficulty is not None and not fits:
+            extras["difficulty"] = difficulty
+        self._set(self.difficulty, word_id, difficulty if fits else -1, fresh)
+        self._set(self.frequency_rank, word_id, FREQUENCY_RANK.get(meta.get("frequency"), len(FREQUENCY_RANK)) if isinstance(meta.get("frequency"), str) else len(FREQUENCY_RANK), fresh)
+        phonetic = meta.get("phonetic")
+        if phonetic is not None and not isinstance(phonetic, str):
+            extras["phonetic"] = phonetic
+            phonetic = ""
+        phonetic = sys.intern(phonetic or "")
+        if fresh:
+            self.phonetic.append(phonetic)
+        else:
+            self.phonetic[word_id] = phonetic
+        template = EXAMPLE_TEMPLATES.get(meta.get("lang"))
+        sentence = meta.get("example_sentence")
+        if sentence is not None and (template is None or sentence != template.format(word=word)):
+            extras["example_sentence"] = sentence
+        elif sentence is None and "example_sentence" in meta and template is not None:
+            extras["example_sentence"] = None
+        for k in ("audio_pronunciation", "image_reference", "teaching_tips"):
+            if meta.get(k) is not None:
+                extras[k] = meta[k]
+        if meta.get("common_mistakes"):
+            extras["common_mistakes"] = list(meta["common_mistakes"])
+        if extras:
+            self.extras[word_id] = extras
+        else:
+            self.extras.pop(word_id, None)
+
+    @staticmethod
+    def _set(column: array, i: int, value: int, fresh: bool):
+        if fresh:
+            column.append(value)
+        else:
+            column[i] = value
+
+    def __getitem__(self, word: str) -> WordRecord:
+        return WordRecord(self, self.ids[word])
+
+    def get(self, word: str, default=None):
+        word_id = self.ids.get(word)
+        return WordRecord(self, word_id) if word_id is not None else default
+
+    def __contains__(self, word) -> bool:
+        return word in self.ids
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+STORAGE_BACKENDS = {"dict": dict, "compact": CompactWordStore}
+
+def synthetic_words(n: int, seed: int = 0) -> Dict[str, Dict]:
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    data: Dict[str, Dict] = {}
+    while len(data) < n:
+        w = "".join(rng.choice(letters) for _ in range(rng.randint(3, 10)))
+        if w not in data:
+            data[w] = {
+                "lang": "english",
+                "phonetic": phonetic_code(w),
+                "age_level": age_level_for(w),
+                "difficulty": 1 if len(w) <= 4 else (2 if len(w) <= 7 else 4),
+                "category": "general",
+                "frequency": "high",
+                "example_sentence": EXAMPLE_TEMPLATES["english"].format(word=w),
+                "audio_pronunciation": None,
+                "image_reference": None,
+                "common_mistakes": [],
+                "teaching_tips": None
+            }
+    return data
+
+def compare_storage_layouts(n: int = 100_000) -> Dict:
+    source = synthetic_words(n)
+    report = {"words": n}
+    for name, factory in STORAGE_BACKENDS.items():
+        gc.collect()
+        tracemalloc.start()
+        store = factory()
+        for w, meta in source.items():
+            store[w] = dict(meta, common_mistakes=[], example_sentence=EXAMPLE_TEMPLATES["english"].format(word=w)) if name == "dict" else meta
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report[name] = {"bytes": current, "bytesPerWord": round(current / n, 1)}
+        del store
+    report["ratio"] = round(report["dict"]["bytes"] / max(1, report["compact"]["bytes"]), 2)
+    return report
+
+_vocab_versions = itertools.count(1)
+
 class Vocabulary:
-    def __init__(self, data: Dict[str, Dict]):
-        self.db = {k: v for k, v in data.items()}
-        self.phonetic_index = {}
-        for w, meta in self.db.items():
-            if meta.get("lang") == "english":
-                p = phonetic_code(w)
-                if p:
-                    self.phonetic_index.setdefault(p, []).append(w)
+    def __init__(self, data: Dict[str, Dict], index_strategy: str = "symdel", storage: str = "compact"):
+        if index_strategy not in INDEX_STRATEGIES:
+            raise ValueError(f"unknown index strategy {index_strategy!r}; expected one of {sorted(INDEX_STRATEGIES)}")
+        if storage not in STORAGE_BACKENDS:
+            raise ValueError(f"unknown storage backend {storage!r}; expected one of {sorted(STORAGE_BACKENDS)}")
+        self.index_strategy = index_strategy
+        self.storage = storage
+        self.version = next(_vocab_versions)
+        self.db = STORAGE_BACKENDS[storage]()
+        self.phonetic_indexes: Dict[str, Dict[str, List[str]]] = {}
+        self.alphabet = ClusterAlphabet()
+        self.ordinal: Dict[str, int] = {}
+        self.indexes: Dict[str, CandidateIndex] = {}
+        self.key_words: Dict[str, Dict[str, List[str]]] = {}
+        self.partitions: Dict[Tuple[Optional[str], Optional[str]], List[str]] = {}
+        self.language_words: Dict[Optional[str], List[str]] = {}
+        self.words_all: List[str] = []
+        self.mistake_index: Dict[str, List[Tuple[str, str]]] = {}
+        self.prefix_indexes: Dict[Optional[str], PrefixIndex] = {}
+        for w, meta in data.items():
+            self._register(w, meta)
+            self._add_to_views(w, meta)
+        for lang, words in self.language_words.items():
+            self.prefix_indexes[lang] = PrefixIndex([(w.lower(), w) for w in words])
+
+    def _register(self, word: str, meta: Dict):
+        self.db[word] = meta
+        self.ordinal[word] = len(self.ordinal)
+        self._index_phonetics(word, meta)
+        self._index_word(word, meta.get("lang"))
+        self._index_mistakes(word, meta)
+
+    def _phonetic_codes(self, word: str, meta: Dict) -> Dict[str, str]:
+        codes = phonetic_keys(word, meta.get("lang"))
+        if "metaphone" in codes and meta.get("phonetic"):
+            codes["metaphone"] = meta["phonetic"]
+        return codes
+
+    def _index_phonetics(self, word: str, meta: Dict):
+        for name, code in self._phonetic_codes(word, meta).items():
+            self.phonetic_indexes.setdefault(name, {}).setdefault(code, []).append(word)
+
+    def _unindex_phonetics(self, word: str, meta: Dict):
+        for name, code in self._phonetic_codes(word, meta).items():
+            entries = self.phonetic_indexes.get(name, {}).get(code)
+            if entries and word in entries:
+                entries.remove(word)
+                if not entries:
+                    del self.phonetic_indexes[name][code]
+
+    def _index_mistakes(self, word: str, meta: Dict):
+        for cm in meta.get("common_mistakes") or []:
+            incorrect = cm.get("incorrect")
+            if incorrect:
+                self.mistake_index.setdefault(incorrect, []).append((word, cm.get("error_type") or "common"))
+
+    def _unindex_mistakes(self, word: str, meta: Dict):
+        for cm in meta.get("common_mistakes") or []:
+            entries = self.mistake_index.get(cm.get("incorrect"))
+            if entries:
+                entries[:] = [e for e in entries if e[0] != word]
+                if not entries:
+                    del self.mistake_index[cm.get("incorrect")]
+
+    def _add_to_views(self, word: str, meta: Dict):
+        self.partitions.setdefault((meta.get("lang"), meta.get("age_level")), []).append(word)
+        self.language_words.setdefault(meta.get("lang"), []).append(word)
+        self.words_all.append(word)
+
+    def add_word(self, word: str, meta: Dict):
+        if not word:
+            raise ValueError("word must be non-empty")
+        old = self.db.get(word)
+        if old is None:
+            self._register(word, meta)
+            self._add_to_views(word, meta)
+            lang = meta.get("lang")
+            if lang in self.prefix_indexes:
+                self.prefix_indexes[lang].add(word.lower(), word)
+            else:
+                self.prefix_indexes[lang] = PrefixIndex([(word.lower(), word)])
+        elif old.get("lang") != meta.get("lang"):
+            raise ValueError(f"{word!r} is already indexed as {old.get('lang')!r}")
+        else:
+            key = (meta.get("lang"), meta.get("age_level"))
+            if key != (old.get("lang"), old.get("age_level")):
+                self.partitions[(old.get("lang"), old.get("age_level"))].remove(word)
+                bisect.insort(self.partitions.setdefault(key, []), word, key=self.ordinal.__getitem__)
+            self._unindex_mistakes(word, old)
+            self._unindex_phonetics(word, old)
+            self.db[word] = meta
+            self._index_phonetics(word, meta)
+            self._index_mistakes(word, meta)
+            self.prefix_indexes[meta.get("lang")].memo.clear()
+        self.version = next(_vocab_versions)
+
+    def add_common_mistake(self, word: str, incorrect: str, error_type: str = "common"):
+        old = self.get(word)
+        if old is None:
+            raise KeyError(word)
+        if self.documented_mistake(word, incorrect):
+            return
+        meta = dict(old)
+        meta["common_mistakes"] = list(old.get("common_mistakes") or []) + [{"incorrect": incorrect, "error_type": error_type}]
+        self.add_word(word if word in self.db else word.lower(), meta)
+
+    def index_key(self, word: str) -> str:
+        return self.alphabet.encode((word or "").lower())
+
+    def _index_word(self, word: str, lang: Optional[str]):
+        key = self.alphabet.encode(word.lower(), intern=True)
+        idx = self.indexes.get(lang)
+        if idx is None:
+            idx = self.indexes[lang] = INDEX_STRATEGIES[self.index_strategy]()
+            self.key_words[lang] = {}
+        idx.add(key)
+        self.key_words[lang].setdefault(key, []).append(word)
+
+    def _languages(self, language: Optional[str]) -> List[str]:
+        if not language:
+            return list(self.indexes)
+        return [language] if language in self.indexes else []
 
     def exists(self, word: str, language: Optional[str] = None, age_level: Optional[str] = None) -> bool:
         if not word:
@@ -136,49 +832,815 @@ class Vocabulary:
             return self.db[word]
         return self.db.get(word.lower())
 
-    def all_words(self, language: Optional[str] = None) -> List[str]:
+    def all_words(self, language: Optional[str] = None) -> Sequence[str]:
         if not language:
-            return list(self.db.keys())
-        return [w for w, m in self.db.items() if m.get("lang") == language]
+            return self.words_all
+        return self.language_words.get(language, ())
+
+    def words(self, language: Optional[str] = None, age_level: Optional[str] = None) -> Sequence[str]:
+        if not age_level:
+            return self.all_words(language)
+        if language:
+            return self.partitions.get((language, age_level), ())
+        found = [w for (_, age), words in self.partitions.items() if age == age_level for w in words]
+        return tuple(sorted(found, key=self.ordinal.__getitem__))
+
+    def completion_rank(self, age_level: Optional[str] = None):
+        db = self.db
+        ordinal = self.ordinal
+        def age_key(age) -> int:
+            if age_level:
+                return 0 if age == age_level else 1
+            return AGE_LEVELS.index(age) if age in AGE_LEVELS else len(AGE_LEVELS)
+        if isinstance(db, CompactWordStore):
+            ids, freq, ages = db.ids, db.frequency_rank, db.columns["age_level"]
+            age_rank = [age_key(a) for a in db.enums["age_level"]]
+            def rank(w: str):
+                word_id = ids[w]
+                return (freq[word_id], age_rank[ages[word_id]], len(w), ordinal[w])
+            return rank
+        def rank(w: str):
+            meta = db[w]
+            return (FREQUENCY_RANK.get(meta.get("frequency"), len(FREQUENCY_RANK)), age_key(meta.get("age_level")), len(w), ordinal[w])
+        return rank
+
+    def prefix_ranges(self, prefix: str, language: Optional[str] = None, within: Optional[Dict[str, Tuple[int, int]]] = None) -> Dict[str, Tuple[int, int]]:
+        key = prefix.lower()
+        return {lang: self.prefix_indexes[lang].span(key, *(within[lang] if within else ())) for lang in self._languages(language)}
+
+    def complete(self, prefix: str, language: Optional[str] = None, age_level: Optional[str] = None, k: int = 5, ranges: Optional[Dict[str, Tuple[int, int]]] = None) -> List[str]:
+        if not prefix:
+            return []
+        rank = self.completion_rank(age_level)
+        key = prefix.lower()
+        found = []
+        for lang in self._languages(language):
+            found.extend(self.prefix_indexes[lang].top(key, k, rank, age_level, *(ranges[lang] if ranges else ())))
+        if len(found) > k:
+            found = heapq.nsmallest(k, found, key=rank)
+        return found
 
-    def find_by_phonetic(self, word: str) -> List[str]:
-        return self.phonetic_index.get(phonetic_code(word), [])
+    def phonetic_matches(self, word: str, language: Optional[str] = None) -> Dict[str, float]:
+        share: Dict[str, float] = {}
+        for lang in self._languages(language):
+            codes = phonetic_keys(word, lang)
+            for name, code in codes.items():
+                for w in self.phonetic_indexes.get(name, {}).get(code, ()):
+                    share[w] = share.get(w, 0.0) + phonetic_weight(lang, name)
+        return {w: share[w] for w in sorted(share, key=self.ordinal.__getitem__)}
+
+    def find_by_phonetic(self, word: str, language: Optional[str] = None) -> List[str]:
+        share = self.phonetic_matches(word, language)
+        return sorted(share, key=lambda w: -share[w])
 
     def documented_mistake(self, candidate: str, misspelled: str) -> bool:
-        meta = self.get(candidate)
-        if not meta:
+        entries = self.mistake_index.get(misspelled)
+        if not entries or not candidate:
             return False
-        for cm in meta.get("common_mistakes", []):
-            if cm.get("incorrect") == misspelled:
-                return True
-        return False
+        word = candidate if candidate in self.db else candidate.lower()
+        return any(w == word for w, _ in entries)
+
+    def documented_for(self, misspelled: str, language: Optional[str] = None) -> List[Tuple[str, str]]:
+        entries = self.mistake_index.get(misspelled)
+        if not entries:
+            return []
+        found = [e for e in entries if not language or self.db[e[0]].get("lang") == language]
+        found.sort(key=lambda e: self.ordinal[e[0]])
+        return found
+
+    def candidates(self, word: str, language: Optional[str] = None, max_distance: int = INDEX_MAX_DISTANCE, deadline: Optional[float] = None) -> List[Tuple[str, int]]:
+        key = self.index_key(word)
+        found = []
+        for lang in self._languages(language):
+            if found and expired(deadline):
+                break
+            words = self.key_words[lang]
+            for k, d in self.indexes[lang].search(key, max_distance).items():
+                found.extend((w, d) for w in words[k])
+        found.sort(key=lambda x: self.ordinal[x[0]])
+        return found
+
+    def nearest(self, word: str, language: Optional[str] = None, deadline: Optional[float] = None) -> Optional[str]:
+        key = self.index_key(word)
+        best = None
+        for lang in self._languages(language):
+            if best is not None and expired(deadline):
+                break
+            hit = self.indexes[lang].nearest(key, deadline)
+            if hit is None:
+                continue
+            w = self.key_words[lang][hit[0]][0]
+            rank = (hit[1], self.ordinal[w])
+            if best is None or rank < best[0]:
+                best = (rank, w)
+        return best[1] if best else None
 
-vocab = Vocabulary(VOCAB)
+COMPILED_MAGIC = b"EFVOCAB1"
+CORE_FIELDS = ("lang", "phonetic", "age_level", "difficulty", "category", "frequency")
+NO_VALUE = 255
+
+def _fits_column(value) -> bool:
+    return type(value) is int and 0 <= value < NO_VALUE
+
+class _SectionWriter:
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.sections: Dict[str, List[int]] = {}
+        self.size = 0
+
+    def add(self, name: str, data: bytes):
+        pad = (-self.size) % 8
+        if pad:
+            self.parts.append(b"\0" * pad)
+            self.size += pad
+        self.sections[name] = [self.size, len(data)]
+        self.parts.append(data)
+        self.size += len(data)
+
+    def ints(self, name: str, values, typecode: str = "I"):
+        self.add(name, array(typecode, values).tobytes())
+
+    def strings(self, name: str, items: List[str]):
+        blobs = [s.encode("utf-8") for s in items]
+        offsets = array("I", [0])
+        for b in blobs:
+            offsets.append(offsets[-1] + len(b))
+        self.add(name + ".off", offsets.tobytes())
+        self.add(name + ".blob", b"".join(blobs))
+
+    def multimap(self, name: str, mapping: Dict[str, List[int]]):
+        keys = sorted(mapping)
+        self.strings(name + ".keys", keys)
+        offsets = [0]
+        values: List[int] = []
+        for k in keys:
+            values.extend(mapping[k])
+            offsets.append(len(values))
+        self.ints(name + ".post", offsets)
+        self.ints(name + ".ids", values)
+
+def _enum(values) -> List:
+    out = []
+    for v in values:
+        if v not in out:
+            out.append(v)
+    return out
+
+def compile_vocabulary(source: Vocabulary, path: str) -> Dict:
+    started = time.perf_counter()
+    words = list(source.all_words())
+    ids = {w: i for i, w in enumerate(words)}
+    metas = [source.get(w) for w in words]
+    enums = {f: _enum(m.get(f) for m in metas) for f in ("lang", "age_level", "category", "frequency")}
+    for f in ("lang", "age_level", "frequency"):
+        if len(enums[f]) >= NO_VALUE:
+            raise ValueError(f"too many distinct {f} values for the compiled format")
+    error_types = _enum(e for entries in source.mistake_index.values() for _, e in entries)
+    out = _SectionWriter()
+    out.strings("words", words)
+    out.ints("sorted", sorted(range(len(words)), key=words.__getitem__))
+    out.ints("col.lang", [enums["lang"].index(m.get("lang")) for m in metas], "B")
+    out.ints("col.age_level", [enums["age_level"].index(m.get("age_level")) for m in metas], "B")
+    out.ints("col.frequency", [enums["frequency"].index(m.get("frequency")) for m in metas], "B")
+    out.ints("col.category", [enums["category"].index(m.get("category")) for m in metas], "H")
+    out.ints("col.length", [len(w) for w in words], "H")
+    out.ints("col.difficulty", [m.get("difficulty") if _fits_column(m.get("difficulty")) else NO_VALUE for m in metas], "B")
+    out.strings("phonetic", [m.get("phonetic") or "" for m in metas])
+    out.strings("rich", [json.dumps({k: v for k, v in m.items() if k not in CORE_FIELDS or (k == "difficulty" and v is not None and not _fits_column(v))}, ensure_ascii=False, separators=(",", ":")) for m in metas])
+    for name, index in source.phonetic_indexes.items():
+        out.multimap(f"phonetic_index.{name}", {code: sorted(ids[w] for w in ws) for code, ws in index.items()})
+    mistakes: Dict[str, List[int]] = {}
+    for incorrect, entries in source.mistake_index.items():
+        flat = mistakes[incorrect] = []
+        for w, e in sorted(entries, key=lambda x: ids[x[0]]):
+            flat.extend((ids[w], error_types.index(e)))
+    out.multimap("mistakes", mistakes)
+    languages: Dict[str, Dict] = {}
+    for li, lang in enumerate(enums["lang"]):
+        lang_ids = [i for i, m in enumerate(metas) if m.get("lang") == lang]
+        out.ints(f"lang.{li}", lang_ids)
+        parts = {}
+        for ai, age in enumerate(enums["age_level"]):
+            part = [i for i in lang_ids if metas[i].get("age_level") == age]
+            if part:
+                out.ints(f"part.{li}.{ai}", part)
+                parts[ai] = len(part)
+        keyed = sorted(((words[i].lower(), i) for i in lang_ids))
+        out.strings(f"prefix.{li}", [k for k, _ in keyed])
+        out.ints(f"prefix.{li}.ids", [i for _, i in keyed])
+        index_keys = {i: source.index_key(words[i]) for i in lang_ids}
+        by_length = sorted(lang_ids, key=lambda i: (len(index_keys[i]), i))
+        spans: Dict[int, List[int]] = {}
+        for pos, i in enumerate(by_length):
+            span = spans.setdefault(len(index_keys[i]), [pos, pos])
+            span[1] = pos + 1
+        out.ints(f"len.{li}", by_length)
+        deletes: Dict[str, List[int]] = {}
+        for i in lang_ids:
+            for d in delete_variants(index_keys[i], INDEX_MAX_DISTANCE):
+                deletes.setdefault(d, []).append(i)
+        out.multimap(f"symdel.{li}", deletes)
+        languages[str(li)] = {"count": len(lang_ids), "partitions": parts, "lengths": spans, "longest": max(spans, default=0)}
+    header = {"format": 3, "byteorder": sys.byteorder, "count": len(words), "max_distance": INDEX_MAX_DISTANCE, "enums": enums, "error_types": error_types, "languages": languages, "phonetic_keys": sorted(source.phonetic_indexes), "clusters": source.alphabet.clusters, "sections": out.sections}
+    head = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    prefix = COMPILED_MAGIC + struct.pack("<Q", len(head)) + head
+    prefix += b"\0" * ((-len(prefix)) % 8)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as fh:
+        fh.write(prefix)
+        for part in out.parts:
+            fh.write(part)
+    os.replace(tmp, path)
+    return {"path": path, "words": len(words), "bytes": len(prefix) + out.size, "seconds": round(time.perf_counter() - started, 3)}
+
+class _StringTable:
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def raw(self, i: int) -> bytes:
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]])
+
+    def __getitem__(self, i: int) -> str:
+        return self.raw(i).decode("utf-8")
+
+    def bisect(self, key: bytes, lo: int = 0, hi: Optional[int] = None) -> int:
+        hi = len(self) if hi is None else hi
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.raw(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+class _DiskMultiMap:
+    def __init__(self, keys: _StringTable, postings: memoryview, ids: memoryview):
+        self.keys = keys
+        self.postings = postings
+        self.ids = ids
+
+    def get(self, key: str):
+        raw = key.encode("utf-8")
+        i = self.keys.bisect(raw)
+        if i < len(self.keys) and self.keys.raw(i) == raw:
+            return self.ids[self.postings[i]:self.postings[i + 1]]
+        return ()
+
+class CompiledEntry(Mapping):
+    __slots__ = ("_vocab", "_id", "_rich")
+
+    def __init__(self, vocab: "CompiledVocabulary", word_id: int):
+        self._vocab = vocab
+        self._id = word_id
+        self._rich = None
+
+    def _rich_fields(self) -> Dict:
+        if self._rich is None:
+            self._rich = json.loads(self._vocab.rich[self._id])
+        return self._rich
+
+    def __getitem__(self, key: str):
+        if key in CORE_FIELDS:
+            return self._vocab.core_field(self._id, key)
+        return self._rich_fields()[key]
+
+    def __iter__(self):
+        yield from CORE_FIELDS
+        yield from (k for k in self._rich_fields() if k not in CORE_FIELDS)
+
+    def __len__(self) -> int:
+        return len(CORE_FIELDS) + sum(k not in CORE_FIELDS for k in self._rich_fields())
+
+class _WordView(Sequence):
+    def __init__(self, table: _StringTable, ids=None):
+        self.table = table
+        self.ids = ids
+
+    def __len__(self) -> int:
+        return len(self.table) if self.ids is None else len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.table[i if self.ids is None else self.ids[i]]
+
+class CompiledVocabulary(Vocabulary):
+    def __init__(self, path: str):
+        self.path = path
+        self.index_strategy = "symdel"
+        self.version = next(_vocab_versions)
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(COMPILED_MAGIC)] != COMPILED_MAGIC:
+            raise ValueError(f"{path} is not a compiled vocabulary")
+        (hlen,) = struct.unpack_from("<Q", self._mm, len(COMPILED_MAGIC))
+        start = len(COMPILED_MAGIC) + 8
+        self.header = json.loads(self._mm[start:start + hlen].decode("utf-8"))
+        if self.header.get("format") != 3 or self.header.get("byteorder") != sys.byteorder:
+            raise ValueError(f"{path} was compiled for an incompatible format or byte order")
+        self._body = start + hlen + ((-(start + hlen)) % 8)
+        self._view = memoryview(self._mm)
+        self._views: List[memoryview] = []
+        self.enums = self.header["enums"]
+        self.error_types = self.header["error_types"]
+        self.max_distance = self.header["max_distance"]
+        self.words_table = self._strings("words")
+        self.sorted_ids = self._ints("sorted")
+        self.columns = {f: self._ints(f"col.{f}", "B") for f in ("lang", "age_level", "frequency", "difficulty")}
+        self.columns["category"] = self._ints("col.category", "H")
+        self.lengths = self._ints("col.length", "H")
+        self.phonetic = self._strings("phonetic")
+        self.rich = self._strings("rich")
+        self.phonetic_maps = {name: self._multimap(f"phonetic_index.{name}") for name in self.header["phonetic_keys"]}
+        self.mistake_map = self._multimap("mistakes")
+        self.alphabet = ClusterAlphabet(self.header["clusters"])
+        self.lang_ids = {lang: li for li, lang in enumerate(self.enums["lang"])}
+        self.language_ids = {}
+        self.prefix_tables = {}
+        self.length_ids = {}
+        self.deletes = {}
+        self.longest: Dict[str, int] = {}
+        for li, lang in enumerate(self.enums["lang"]):
+            self.language_ids[lang] = self._ints(f"lang.{li}")
+            self.prefix_tables[lang] = (self._strings(f"prefix.{li}"), self._ints(f"prefix.{li}.ids"))
+            self.length_ids[lang] = self._ints(f"len.{li}")
+            self.deletes[lang] = self._multimap(f"symdel.{li}")
+            info = self.header["languages"][str(li)]
+            self.longest[lang] = info.get("longest", max(map(int, info["lengths"]), default=0))
+        self.prefix_memo: Dict[Tuple[str, str, Optional[str]], List[str]] = {}
+
+    def _section(self, name: str) -> memoryview:
+        off, length = self.header["sections"][name]
+        view = self._view[self._body + off:self._body + off + length]
+        self._views.append(view)
+        return view
+
+    def _ints(self, name: str, typecode: str = "I") -> memoryview:
+        view = self._section(name).cast(typecode)
+        self._views.append(view)
+        return view
+
+    def _strings(self, name: str) -> _StringTable:
+        return _StringTable(self._ints(name + ".off"), self._section(name + ".blob"))
+
+    def _multimap(self, name: str) -> _DiskMultiMap:
+        return _DiskMultiMap(self._strings(name + ".keys"), self._ints(name + ".post"), self._ints(name + ".ids"))
+
+    def __len__(self) -> int:
+        return self.header["count"]
+
+    def core_field(self, word_id: int, field: str):
+        if field == "phonetic":
+            return self.phonetic[word_id]
+        value = self.columns[field][word_id]
+        if field == "difficulty":
+            return json.loads(self.rich[word_id]).get("difficulty") if value == NO_VALUE else value
+        return self.enums[field][value]
+
+    def word_id(self, word: str) -> Optional[int]:
+        if not word:
+            return None
+        raw = word.encode("utf-8")
+        ids = self.sorted_ids
+        lo, hi = 0, len(ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.words_table.raw(ids[mid]) < raw:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(ids) and self.words_table.raw(ids[lo]) == raw:
+            return ids[lo]
+        return None
+
+    def _lookup(self, word: str) -> Optional[int]:
+        found = self.word_id(word)
+        if found is None and word:
+            found = self.word_id(word.lower())
+        return found
+
+    def add_word(self, word: str, meta: Dict):
+        raise TypeError("compiled vocabularies are read-only; rebuild the vocabulary file instead")
+
+    def add_common_mistake(self, word: str, incorrect: str, error_type: str = "common"):
+        raise TypeError("compiled vocabularies are read-only; rebuild the vocabulary file instead")
+
+    def exists(self, word: str, language: Optional[str] = None, age_level: Optional[str] = None) -> bool:
+        word_id = self._lookup(word)
+        if word_id is None:
+            return False
+        if language and self.core_field(word_id, "lang") != language:
+            return False
+        if age_level and self.core_field(word_id, "age_level") != age_level:
+            return False
+        return True
+
+    def get(self, word: str) -> Optional[Mapping]:
+        word_id = self._lookup(word)
+        return CompiledEntry(self, word_id) if word_id is not None else None
+
+    def all_words(self, language: Optional[str] = None) -> Sequence:
+        if not language:
+            return _WordView(self.words_table)
+        return _WordView(self.words_table, self.language_ids.get(language, ()))
+
+    def words(self, language: Optional[str] = None, age_level: Optional[str] = None) -> Sequence:
+        if not age_level:
+            return self.all_words(language)
+        if age_level not in self.enums["age_level"]:
+            return ()
+        ai = self.enums["age_level"].index(age_level)
+        found = []
+        for lang in self._languages(language):
+            li = self.lang_ids[lang]
+            if str(ai) in self.header["languages"][str(li)]["partitions"]:
+                found.extend(self._ints(f"part.{li}.{ai}"))
+        return _WordView(self.words_table, sorted(found))
+
+    def _languages(self, language: Optional[str]) -> List[str]:
+        if not language:
+            return list(self.lang_ids)
+        return [language] if language in self.lang_ids else []
+
+    def phonetic_matches(self, word: str, language: Optional[str] = None) -> Dict[str, float]:
+        share: Dict[int, float] = {}
+        for lang in self._languages(language):
+            for name, code in phonetic_keys(word, lang).items():
+                if name in self.phonetic_maps:
+                    for word_id in self.phonetic_maps[name].get(code):
+                        share[word_id] = share.get(word_id, 0.0) + phonetic_weight(lang, name)
+        return {self.words_table[i]: share[i] for i in sorted(share)}
+
+    def documented_mistake(self, candidate: str, misspelled: str) -> bool:
+        entries = self.mistake_map.get(misspelled)
+        if not entries or not candidate:
+            return False
+        word_id = self.word_id(candidate)
+        if word_id is None:
+            word_id = self.word_id(candidate.lower())
+        return word_id is not None and word_id in entries[0::2]
+
+    def documented_for(self, misspelled: str, language: Optional[str] = None) -> List[Tuple[str, str]]:
+        entries = self.mistake_map.get(misspelled)
+        found = []
+        for k in range(0, len(entries), 2):
+            word_id = entries[k]
+            if not language or self.core_field(word_id, "lang") == language:
+                found.append((self.words_table[word_id], self.error_types[entries[k + 1]]))
+        return found
+
+    def candidates(self, word: str, language: Optional[str] = None, max_distance: int = INDEX_MAX_DISTANCE, deadline: Optional[float] = None) -> List[Tuple[str, int]]:
+        if max_distance > self.max_distance:
+            raise ValueError(f"index built for max_distance={self.max_distance}, got {max_distance}")
+        key = self.index_key(word)
+        found = []
+        for lang in self._languages(language):
+            if found and expired(deadline):
+                break
+            if len(key) > self.longest[lang] + max_distance:
+                continue
+            table = self.deletes[lang]
+            hits = set()
+            for d in delete_variants(key, max_distance):
+                hits.update(table.get(d))
+            groups: Dict[str, List[int]] = {}
+            for word_id in hits:
+                groups.setdefault(self.index_key(self.words_table[word_id]), []).append(word_id)
+            keys = list(groups)
+            for k, d in zip(keys, damerau_levenshtein_batch(key, keys, max_distance)):
+                if d <= max_distance:
+                    found.extend((word_id, d) for word_id in groups[k])
+        found.sort()
+        return [(self.words_table[word_id], d) for word_id, d in found]
+
+    def nearest(self, word: str, language: Optional[str] = None, deadline: Optional[float] = None) -> Optional[str]:
+        key = self.index_key(word)
+        n = len(key)
+        best = None
+        best_d = math.inf
+        for lang in self._languages(language):
+            li = self.lang_ids[lang]
+            spans = self.header["languages"][str(li)]["lengths"]
+            ids = self.length_ids[lang]
+            for length in sorted(spans, key=lambda length: abs(int(length) - n)):
+                gap = abs(int(length) - n)
+                if gap > best_d or (best is not None and expired(deadline)):
+                    break
+                lo, hi = spans[length]
+                for pos in range(lo, hi):
+                    word_id = ids[pos]
+                    if gap == best_d and word_id > best:
+                        break
+                    k = self.index_key(self.words_table[word_id])
+                    d = edit_distance(key, k) if best is None else damerau_levenshtein_bounded(key, k, best_d)
+                    if d < best_d or (d == best_d and word_id < best):
+                        best, best_d = word_id, d
+        return self.words_table[best] if best is not None else None
+
+    def completion_rank(self, age_level: Optional[str] = None):
+        freq = self.columns["frequency"]
+        ages = self.columns["age_level"]
+        freq_rank = [FREQUENCY_RANK.get(f, len(FREQUENCY_RANK)) for f in self.enums["frequency"]]
+        age_rank = [(0 if a == age_level else 1) if age_level else (AGE_LEVELS.index(a) if a in AGE_LEVELS else len(AGE_LEVELS)) for a in self.enums["age_level"]]
+        lengths = self.lengths
+        def rank(word_id: int):
+            return (freq_rank[freq[word_id]], age_rank[ages[word_id]], lengths[word_id], word_id)
+        return rank
+
+    def prefix_ranges(self, prefix: str, language: Optional[str] = None, within: Optional[Dict[str, Tuple[int, int]]] = None) -> Dict[str, Tuple[int, int]]:
+        raw = prefix.lower().encode("utf-8")
+        found = {}
+        for lang in self._languages(language):
+            keys = self.prefix_tables[lang][0]
+            lo, hi = within[lang] if within else (0, len(keys))
+            start = keys.bisect(raw, lo, hi)
+            found[lang] = (start, keys.bisect(raw + b"\xf4\x8f\xbf\xbf", start, hi))
+        return found
+
+    def complete(self, prefix: str, language: Optional[str] = None, age_level: Optional[str] = None, k: int = 5, ranges: Optional[Dict[str, Tuple[int, int]]] = None) -> List[str]:
+        if not prefix:
+            return []
+        rank = self.completion_rank(age_level)
+        key = prefix.lower()
+        found = []
+        for lang in self._languages(language):
+            memo_key = (lang, key, age_level)
+            if k <= PREFIX_MEMO_SIZE and memo_key in self.prefix_memo:
+                found.extend(self.prefix_memo[memo_key][:k])
+                continue
+            keys, ids = self.prefix_tables[lang]
+            if ranges:
+                start, end = ranges[lang]
+            else:
+                raw = key.encode("utf-8")
+                start = keys.bisect(raw)
+                end = keys.bisect(raw + b"\xf4\x8f\xbf\xbf", start)
+            if memoizable(key, age_level, k, end - start):
+                top = self.prefix_memo[memo_key] = heapq.nsmallest(PREFIX_MEMO_SIZE, ids[start:end], key=rank)
+                found.extend(top[:k])
+            else:
+                found.extend(heapq.nsmallest(k, ids[start:end], key=rank))
+        return [self.words_table[i] for i in heapq.nsmallest(k, found, key=rank)]
+
+    def close(self):
+        while self._views:
+            self._views.pop().release()
+        self._view.release()
+        self._mm.close()
+
+def load_vocabulary(path: Optional[str] = None, data: Optional[Dict[str, Dict]] = None, index_strategy: str = "symdel") -> Vocabulary:
+    if path:
+        return CompiledVocabulary(path)
+    return Vocabulary(build_builtin_vocab() if data is None else data, index_strategy=index_strategy)
+
+METRICS_ENABLED = os.environ.get("EFFLING_METRICS", "0") == "1"
+PROFILER_ENABLED = os.environ.get("EFFLING_PROFILER", "0") == "1"
+PROFILE_MAX_SECONDS = 60.0
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "total", "lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.total += value
+
+    def render(self, name: str, labels: str) -> List[str]:
+        with self.lock:
+            counts, total = list(self.counts), self.total
+        lines, running = [], 0
+        sep = "," if labels else ""
+        for bound, n in zip(self.bounds + (float("inf"),), counts):
+            running += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{le}"}} {running}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {total!r}")
+        lines.append(f"{name}_count{suffix} {running}")
+        return lines
+
+class Metrics:
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.stages: Dict[str, Histogram] = {}
+        self.requests: Dict[str, Histogram] = {}
+        self.candidates = Histogram(COUNT_BUCKETS)
+        self.lock_waits: Dict[str, List[float]] = {}
+
+    def start(self) -> int:
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def _histogram(self, table: Dict[str, Histogram], name: str) -> Histogram:
+        hist = table.get(name)
+        if hist is None:
+            with self.lock:
+                hist = table.setdefault(name, Histogram(LATENCY_BUCKETS))
+        return hist
+
+    def lap(self, stage: str, started: int) -> int:
+        if not started:
+            return 0
+        now = time.perf_counter_ns()
+        self._histogram(self.stages, stage).observe((now - started) / 1e9)
+        return now
+
+    def request(self, endpoint: str, started: int):
+        if started:
+            self._histogram(self.requests, endpoint).observe((time.perf_counter_ns() - started) / 1e9)
+
+    def scored(self, n: int):
+        if self.enabled:
+            self.candidates.observe(n)
+
+    def acquire(self, lock, name: str = "analytics"):
+        if not self.enabled:
+            lock.acquire()
+            return
+        started = time.perf_counter_ns()
+        lock.acquire()
+        waited = (time.perf_counter_ns() - started) / 1e9
+        with self.lock:
+            entry = self.lock_waits.setdefault(name, [0.0, 0])
+            entry[0] += waited
+            entry[1] += 1
+
+    def render(self, lock_waits: Optional[Dict[str, List[float]]] = None, gauges: Optional[Dict[str, float]] = None) -> str:
+        lines = ["# HELP effling_stage_seconds Time spent in each spelling pipeline stage.", "# TYPE effling_stage_seconds histogram"]
+        for stage, hist in sorted(self.stages.items()):
+            lines.extend(hist.render("effling_stage_seconds", f'stage="{stage}"'))
+        lines += ["# HELP effling_request_seconds Request latency by endpoint.", "# TYPE effling_request_seconds histogram"]
+        for endpoint, hist in sorted(self.requests.items()):
+            lines.extend(hist.render("effling_request_seconds", f'endpoint="{endpoint}"'))
+        lines += ["# HELP effling_candidates_scored Candidates scored per suggestion ranking.", "# TYPE effling_candidates_scored histogram"]
+        lines.extend(self.candidates.render("effling_candidates_scored", ""))
+        waits = self.lock_waits if lock_waits is None else lock_waits
+        lines += ["# HELP effling_lock_wait_seconds_total Time spent waiting to acquire analytics locks.", "# TYPE effling_lock_wait_seconds_total counter"]
+        lines += [f'effling_lock_wait_seconds_total{{lock="{name}"}} {w[0]!r}' for name, w in sorted(waits.items())]
+        lines += ["# HELP effling_lock_acquisitions_total Timed analytics lock acquisitions.", "# TYPE effling_lock_acquisitions_total counter"]
+        lines += [f'effling_lock_acquisitions_total{{lock="{name}"}} {w[1]}' for name, w in sorted(waits.items())]
+        for name, value in sorted((gauges or {}).items()):
+            lines += [f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}", f"{name} {value}"]
+        lines += ["# TYPE effling_metrics_enabled gauge", f"effling_metrics_enabled {int(self.enabled)}"]
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+class SamplingProfiler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = False
+
+    def capture(self, seconds: float, interval: float = 0.005) -> str:
+        with self.lock:
+            if self.running:
+                raise RuntimeError("a profile is already being captured")
+            self.running = True
+        try:
+            me = threading.get_ident()
+            stacks: Dict[str, int] = {}
+            end = time.monotonic() + min(seconds, PROFILE_MAX_SECONDS)
+            while time.monotonic() < end:
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    names = []
+                    while frame is not None:
+                        code = frame.f_code
+                        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                        frame = frame.f_back
+                    key = ";".join(reversed(names))
+                    stacks[key] = stacks.get(key, 0) + 1
+                time.sleep(interval)
+            return "".join(f"{stack} {n}\n" for stack, n in sorted(stacks.items(), key=lambda kv: -kv[1]))
+        finally:
+            self.running = False
+
+profiler = SamplingProfiler()
+
+_MISSING = object()
+
+class LRUCache:
+    def __init__(self, maxsize: int = 4096, ttl: Optional[float] = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sync(self, generation: int) -> bool:
+        if generation > self.generation:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self.generation = generation
+        return generation == self.generation
+
+    def get(self, key, generation: int = 0, default=_MISSING):
+        with self._lock:
+            if not self._sync(generation):
+                self.misses += 1
+                return default
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if self.ttl is not None and entry[0] < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, key, generation: int = 0) -> bool:
+        with self._lock:
+            entry = self._data.get(key) if generation == self.generation else None
+            return entry is not None and (self.ttl is None or entry[0] >= time.monotonic())
+
+    def put(self, key, value, generation: int = 0):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else math.inf
+        with self._lock:
+            if not self._sync(generation) or self.maxsize <= 0:
+                return
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl, "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "expirations": self.expirations, "invalidations": self.invalidations, "hitRate": round(self.hits / lookups, 4) if lookups else 0.0}
+
+CACHE_MAXSIZE = int(os.environ.get("EFFLING_CACHE_SIZE", "4096"))
+CACHE_TTL = float(os.environ.get("EFFLING_CACHE_TTL", "600"))
+suggestion_cache = LRUCache(CACHE_MAXSIZE, CACHE_TTL)
 
 class SpellingSuggester:
-    def __init__(self, vocab: Vocabulary):
+    def __init__(self, vocab: Vocabulary, cache: Optional[LRUCache] = None):
         self.vocab = vocab
+        self.cache = cache
+
+    def get_suggestions(self, word: str, language: Optional[str] = None, age_level: Optional[str] = None, max_suggestions: int = 4, deadline: Optional[float] = None):
+        return self.ranked(word, language, age_level, deadline)[:max_suggestions]
+
+    def ranked(self, word: str, language: Optional[str] = None, age_level: Optional[str] = None, deadline: Optional[float] = None) -> List[Dict]:
+        if self.cache is None:
+            return self.rank_candidates(word, language, age_level, deadline)
+        ranked = self.cache.get(self.key(word, language, age_level), self.vocab.version)
+        if ranked is _MISSING:
+            ranked = self.rank_candidates(word, language, age_level, deadline)
+            self.remember(word, language, age_level, ranked, deadline)
+        return ranked
+
+    def remember(self, word: str, language: Optional[str], age_level: Optional[str], ranked: List[Dict], deadline: Optional[float] = None):
+        if self.cache is not None and not expired(deadline):
+            self.cache.put(self.key(word, language, age_level), ranked, self.vocab.version)
+
+    @staticmethod
+    def key(word: str, language: Optional[str], age_level: Optional[str]) -> Tuple:
+        return ("suggest", word, language, age_level)
 
-    def get_suggestions(self, word: str, language: Optional[str] = None, age_level: Optional[str] = None, max_suggestions: int = 4):
+    def rank_candidates(self, word: str, language: Optional[str] = None, age_level: Optional[str] = None, deadline: Optional[float] = None) -> List[Dict]:
         miss = (word or "")
         candidates = []
-        search_space = self.vocab.all_words(language) if language else self.vocab.all_words()
-        for w in search_space:
-            if w == miss:
-                continue
-            try:
-                dist = damerau_levenshtein(miss.lower(), w.lower())
-            except Exception:
-                dist = 99
-            if dist <= 2:
+        started = metrics.start()
+        for w, dist in self.vocab.candidates(miss, language, deadline=deadline):
+            if w != miss:
                 candidates.append((w, dist))
-        if language in (None, "english"):
-            for w in self.vocab.find_by_phonetic(miss):
+        started = metrics.lap("candidates", started)
+        for w, share in self.vocab.phonetic_matches(miss, language).items():
+            if share >= PHONETIC_CONSENSUS:
                 candidates.append((w, 2))
-        documented = []
-        for w in search_space:
-            if self.vocab.documented_mistake(w, miss):
-                documented.append((w, 0))
+        started = metrics.lap("phonetic", started)
+        documented = [(w, 0) for w, _ in self.vocab.documented_for(miss, language)]
+        documented_words = {w for w, _ in documented}
+        started = metrics.lap("documented", started)
         combined = {}
         for w, d in documented + candidates:
             if w in combined:
@@ -191,69 +1653,157 @@ class SpellingSuggester:
             score = 1 / (1 + dist)
             if meta.get("frequency") == "high":
                 score += 0.25
-            if self.vocab.documented_mistake(w, miss):
+            if w in documented_words:
                 score += 0.35
             if age_level and meta.get("age_level") == age_level:
                 score += 0.15
             scored.append({"word": w, "score": round(score, 2), "phonetic": meta.get("phonetic")})
-        return sorted(scored, key=lambda x: x["score"], reverse=True)[:max_suggestions]
+        scored.sort(key=lambda x: x["score"], reverse=True)
+        metrics.lap("score", started)
+        metrics.scored(len(scored))
+        return scored
 
-def align_and_classify(written: str, correct: str) -> List[Dict]:
-    written = written or ""
-    correct = correct or ""
-    i = j = 0
+MATCH, SUBSTITUTE, MISSING, EXTRA, TRANSPOSE = range(5)
+
+class AlignmentBuffers(threading.local):
+    def __init__(self):
+        self.dist: List[int] = []
+        self.back = bytearray()
+        self.jump: List[int] = []
+
+    def reserve(self, size: int):
+        if len(self.dist) < size:
+            grow = max(size, 2 * len(self.dist))
+            self.dist.extend([0] * (grow - len(self.dist)))
+            self.back.extend(bytes(grow - len(self.back)))
+            self.jump.extend([0] * (grow - len(self.jump)))
+
+alignment_buffers = AlignmentBuffers()
+
+def align(written: str, correct: str) -> Tuple[int, List[Dict]]:
+    w = grapheme_clusters(written or "")
+    c = grapheme_clusters(correct or "")
+    wo = cluster_offsets(w)
+    co = cluster_offsets(c)
+    a = w[::-1]
+    b = c[::-1]
+    n, m = len(a), len(b)
+    width = m + 2
+    inf = n + m
+    buf = alignment_buffers
+    buf.reserve((n + 2) * width)
+    dist, back, jump = buf.dist, buf.back, buf.jump
+    dist[0] = inf
+    for i in range(n + 1):
+        dist[(i + 1) * width] = inf
+        dist[(i + 1) * width + 1] = i
+        back[(i + 1) * width + 1] = EXTRA
+    for j in range(m + 1):
+        dist[j + 1] = inf
+        dist[width + j + 1] = j
+        back[width + j + 1] = MISSING
+    da: Dict[str, int] = {}
+    for i in range(1, n + 1):
+        ai = a[i - 1]
+        row = (i + 1) * width
+        prev = i * width
+        db = 0
+        for j in range(1, m + 1):
+            bj = b[j - 1]
+            i1 = da.get(bj, 0)
+            j1 = db
+            if ai == bj:
+                best, op = dist[prev + j], MATCH
+                db = j
+            else:
+                best, op = dist[prev + j] + 1, SUBSTITUTE
+            if i1 and j1:
+                t = dist[i1 * width + j1] + (i - i1 - 1) + 1 + (j - j1 - 1)
+                if t < best:
+                    best, op = t, TRANSPOSE
+                    jump[row + j + 1] = i1 * width + j1
+            if dist[row + j] + 1 < best:
+                best, op = dist[row + j] + 1, MISSING
+            if dist[prev + j + 1] + 1 < best:
+                best, op = dist[prev + j + 1] + 1, EXTRA
+            dist[row + j + 1] = best
+            back[row + j + 1] = op
+        da[ai] = i
+    distance = dist[(n + 1) * width + m + 1]
+    def at_written(p):
+        return wo[p] if p < n else None
+    def at_correct(q):
+        return co[q] if q < m else None
     mistakes = []
-    while i < len(written) and j < len(correct):
-        if written[i] == correct[j]:
-            i += 1; j += 1; continue
-        if i+1 < len(written) and j+1 < len(correct) and written[i] == correct[j+1] and written[i+1] == correct[j]:
-            mistakes.append({"position_written": i, "position_correct": j, "error_type": "transposition", "written": written[i:i+2], "correct": correct[j:j+2]})
-            i += 2; j += 2; continue
-        if len(written) - i > len(correct) - j:
-            mistakes.append({"position_written": i, "position_correct": j, "error_type": "extra_letter", "written": written[i], "correct": None})
-            i += 1; continue
-        if len(correct) - j > len(written) - i:
-            mistakes.append({"position_written": i, "position_correct": j, "error_type": "missing_letter", "written": None, "correct": correct[j]})
-            j += 1; continue
-        mistakes.append({"position_written": i, "position_correct": j, "error_type": "wrong_letter", "written": written[i], "correct": correct[j]})
-        i += 1; j += 1
-    while i < len(written):
-        mistakes.append({"position_written": i, "position_correct": None, "error_type": "extra_letter", "written": written[i], "correct": None})
-        i += 1
-    while j < len(correct):
-        mistakes.append({"position_written": None, "position_correct": j, "error_type": "missing_letter", "written": None, "correct": correct[j]})
-        j += 1
-    return mistakes
+    i, j = n, m
+    while i > 0 or j > 0:
+        op = back[(i + 1) * width + j + 1]
+        p, q = n - i, m - j
+        if op == MATCH:
+            i -= 1; j -= 1
+        elif op == SUBSTITUTE:
+            mistakes.append({"position_written": wo[p], "position_correct": co[q], "error_type": "wrong_letter", "written": w[p], "correct": c[q]})
+            i -= 1; j -= 1
+        elif op == MISSING:
+            mistakes.append({"position_written": at_written(p), "position_correct": co[q], "error_type": "missing_letter", "written": None, "correct": c[q]})
+            j -= 1
+        elif op == EXTRA:
+            mistakes.append({"position_written": wo[p], "position_correct": at_correct(q), "error_type": "extra_letter", "written": w[p], "correct": None})
+            i -= 1
+        else:
+            i1, j1 = divmod(jump[(i + 1) * width + j + 1], width)
+            p2, q2 = n - i1, m - j1
+            mistakes.append({"position_written": wo[p], "position_correct": co[q], "error_type": "transposition", "written": w[p] + w[p2], "correct": c[q] + c[q2]})
+            mistakes.extend({"position_written": wo[k], "position_correct": co[q2], "error_type": "extra_letter", "written": w[k], "correct": None} for k in range(p + 1, p2))
+            mistakes.extend({"position_written": wo[p2], "position_correct": co[k], "error_type": "missing_letter", "written": None, "correct": c[k]} for k in range(q + 1, q2))
+            i, j = i1 - 1, j1 - 1
+    return distance, mistakes
+
+def align_and_classify(written: str, correct: str) -> List[Dict]:
+    return align(written, correct)[1]
 
 class MistakeAnalyzer:
-    def __init__(self, vocab: Vocabulary):
+    def __init__(self, vocab: Vocabulary, cache: Optional[LRUCache] = None):
         self.vocab = vocab
-        self.suggester = SpellingSuggester(vocab)
+        self.cache = cache
+        self.suggester = SpellingSuggester(vocab, cache)
 
-    def find_intended_word(self, written_word: str, language: Optional[str] = None, age_level: Optional[str] = None) -> str:
+    def find_intended_word(self, written_word: str, language: Optional[str] = None, age_level: Optional[str] = None, deadline: Optional[float] = None) -> str:
         if self.vocab.exists(written_word, language=language, age_level=age_level):
             return written_word
-        suggestions = self.suggester.get_suggestions(written_word, language=language, age_level=age_level, max_suggestions=1)
+        suggestions = self.suggester.get_suggestions(written_word, language=language, age_level=age_level, max_suggestions=1, deadline=deadline)
         if suggestions:
             return suggestions[0]["word"]
-        best = None
-        best_d = math.inf
-        space = self.vocab.all_words(language) if language else self.vocab.all_words()
-        for w in space:
-            try:
-                d = damerau_levenshtein(written_word.lower(), w.lower())
-            except Exception:
-                d = 99
-            if d < best_d:
-                best_d = d
-                best = w
+        started = metrics.start()
+        best = self.vocab.nearest(written_word, language, deadline)
+        metrics.lap("nearest", started)
         return best or written_word
 
-    def analyze_mistake(self, written_word: str, child_profile: dict):
+    def analyze_mistake(self, written_word: str, child_profile: dict, deadline: Optional[float] = None):
+        key = self.key(written_word, child_profile)
+        if self.cache is None:
+            return self._analyze(written_word, key[2], key[3], deadline)
+        result = self.cache.get(key, self.vocab.version)
+        if result is _MISSING:
+            result = self._analyze(written_word, key[2], key[3], deadline)
+            self.remember(written_word, child_profile, result, deadline)
+        return result
+
+    def remember(self, written_word: str, child_profile: dict, result: Dict, deadline: Optional[float] = None):
+        if self.cache is not None and not expired(deadline):
+            self.cache.put(self.key(written_word, child_profile), result, self.vocab.version)
+
+    @staticmethod
+    def key(written_word: str, child_profile: dict) -> Tuple:
         language = child_profile.get("language") if child_profile and child_profile.get("language") else None
         age = child_profile.get("ageGroup") if child_profile else None
-        intended = self.find_intended_word(written_word, language=language, age_level=age)
+        return ("analysis", written_word, language, age)
+
+    def _analyze(self, written_word: str, language: Optional[str], age: Optional[str], deadline: Optional[float] = None) -> Dict:
+        intended = self.find_intended_word(written_word, language=language, age_level=age, deadline=deadline)
+        started = metrics.start()
         positions = align_and_classify(written_word, intended)
+        started = metrics.lap("align", started)
         types = {p["error_type"] for p in positions}
         if "missing_letter" in types:
             main = "missing_letter"
@@ -263,64 +1813,1360 @@ class MistakeAnalyzer:
             main = "transposition"
         else:
             main = "wrong_letter"
-        return {"written_word": written_word, "intended_word": intended, "type": main, "positions": positions, "common_mistake": self.vocab.documented_mistake(intended, written_word), "teaching_opportunity": "Practice phonics/letters."}
+        common = self.vocab.documented_mistake(intended, written_word)
+        metrics.lap("documented", started)
+        return {"written_word": written_word, "intended_word": intended, "type": main, "positions": positions, "common_mistake": common, "teaching_opportunity": "Practice phonics/letters."}
+
+def word_evaluation(suggestions: List[Dict], mistake_analysis: Dict) -> Dict:
+    intended = mistake_analysis.get("intended_word") or (suggestions[0]["word"] if suggestions else "")
+    visual_mistakes = []
+    for p in mistake_analysis["positions"]:
+        visual_mistakes.append({"position_written": p.get("position_written"), "position_correct": p.get("position_correct"), "type": p.get("error_type"), "written": p.get("written"), "correct": p.get("correct")})
+    return {"isCorrect": False, "intended": intended, "suggestions": suggestions, "mistakes": visual_mistakes}
+
+PASSAGE_TOKEN = re.compile(r"(?P<english>[A-Za-z]+)|(?P<hindi>[\u0900-\u0963\u0971-\u097f][\u0900-\u0963\u0971-\u097f\u200c\u200d]*)")
+PASSAGE_MAX_TOKEN = int(os.environ.get("EFFLING_PASSAGE_MAX_TOKEN", "40"))
+PASSAGE_CONTINUATION = {"english": re.compile(r"[A-Za-z]+"), "hindi": re.compile(r"[\u0900-\u0963\u0971-\u097f\u200c\u200d]+")}
+PASSAGE_SEEN = int(os.environ.get("EFFLING_PASSAGE_SEEN", "2048"))
+
+def passage_tokens(chunks: Iterable[str]) -> Iterator[Tuple[str, int, str]]:
+    carry, base, spill = "", 0, None
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if spill is not None:
+            m = PASSAGE_CONTINUATION[spill[2]].match(chunk)
+            if m and m.end() == len(chunk):
+                base += len(chunk)
+                continue
+            yield spill
+            spill = None
+            if m:
+                base += m.end()
+                chunk = chunk[m.end():]
+        text = carry + chunk
+        last = None
+        for m in PASSAGE_TOKEN.finditer(text):
+            if last is not None:
+                yield last.group()[:PASSAGE_MAX_TOKEN + 1], base + last.start(), last.lastgroup
+            last = m
+        carry = ""
+        if last is not None:
+            if last.end() < len(text):
+                yield last.group()[:PASSAGE_MAX_TOKEN + 1], base + last.start(), last.lastgroup
+            elif last.end() - last.start() > PASSAGE_MAX_TOKEN:
+                spill = (last.group()[:PASSAGE_MAX_TOKEN + 1], base + last.start(), last.lastgroup)
+            else:
+                carry = last.group()
+        base += len(text) - len(carry)
+    if spill is not None:
+        yield spill
+    elif carry:
+        m = PASSAGE_TOKEN.match(carry)
+        yield carry, base, m.lastgroup
+
+class PassageChecker:
+    def __init__(self, analyzer: MistakeAnalyzer, evaluate=None):
+        self.analyzer = analyzer
+        self.evaluate = evaluate or self._evaluate
+
+    def _evaluate(self, query_word: str, language: str, child_profile: dict) -> Dict:
+        suggestions = self.analyzer.suggester.get_suggestions(query_word, language, child_profile.get("ageGroup"), 4)
+        return word_evaluation(suggestions, self.analyzer.analyze_mistake(query_word, child_profile))
+
+    def check(self, chunks: Iterable[str], child_profile: Optional[dict] = None) -> Iterator[Dict]:
+        child_profile = child_profile or {}
+        age_group = child_profile.get("ageGroup")
+        vocab = self.analyzer.vocab
+        seen: OrderedDict = OrderedDict()
+        started = time.perf_counter()
+        tokens = known = unknown = too_long = 0
+        for token, offset, language in passage_tokens(chunks):
+            tokens += 1
+            query_word = token.lower() if language == "english" else token
+            if vocab.exists(query_word, language=language, age_level=age_group):
+                known += 1
+                continue
+            unknown += 1
+            if len(token) > PASSAGE_MAX_TOKEN:
+                too_long += 1
+                yield {"token": token, "offset": offset, "language": language, "isCorrect": False, "skipped": "too_long"}
+                continue
+            key = (query_word, language)
+            entry = seen.get(key)
+            if entry is None:
+                entry = seen[key] = [self.evaluate(query_word, language, dict(child_profile, language=language)), 0]
+                if len(seen) > PASSAGE_SEEN:
+                    seen.popitem(last=False)
+            else:
+                seen.move_to_end(key)
+            entry[1] += 1
+            result = entry[0]
+            yield {"token": token, "offset": offset, "language": language, "isCorrect": False, "occurrence": entry[1], "intended": result["intended"], "suggestions": result["suggestions"], "mistakes": result["mistakes"]}
+        yield {"summary": {"tokens": tokens, "known": known, "unknown": unknown, "tooLong": too_long, "seconds": round(time.perf_counter() - started, 4)}}
+
+class VocabularySnapshot:
+    __slots__ = ("vocab", "analyzer", "version")
+
+    def __init__(self, vocab: Vocabulary):
+        self.vocab = vocab
+        self.analyzer = MistakeAnalyzer(vocab, cache=suggestion_cache)
+        self.version = vocab.version
+
+serving = VocabularySnapshot(CompiledVocabulary(VOCAB_FILE) if VOCAB_FILE else Vocabulary(VOCAB))
+
+def install_vocabulary(new_vocab: Vocabulary) -> VocabularySnapshot:
+    global serving
+    serving = VocabularySnapshot(new_vocab)
+    return serving
+
+VOCAB_WATCH_INTERVAL = float(os.environ.get("EFFLING_VOCAB_WATCH", "0"))
+
+class VocabularyReloader:
+    def __init__(self, compiled_path: Optional[str] = VOCAB_FILE, source_path: Optional[str] = VOCAB_SOURCE, interval: float = VOCAB_WATCH_INTERVAL):
+        self.compiled_path = compiled_path
+        self.source_path = source_path
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.words: Dict[str, Dict] = {}
+        self.mistakes: List[Tuple[str, str, str]] = []
+        self.staged: List[Tuple[Dict[str, Dict], List[Tuple[str, str, str]]]] = []
+        self.thread: Optional[threading.Thread] = None
+        self.pending = False
+        self.master: Optional[int] = None
+        self.builds = self.failures = 0
+        self.last: Dict = {"version": serving.version, "words": len(serving.vocab.all_words()), "seconds": None, "error": None, "finished": None}
+        self._stamp = self.stamp()
+        self._watcher: Optional[threading.Thread] = None
+
+    def stamp(self) -> Tuple:
+        stamps = []
+        for path in (self.compiled_path, self.source_path):
+            if path:
+                try:
+                    st = os.stat(path)
+                    stamps.append((st.st_mtime_ns, st.st_size))
+                except OSError:
+                    stamps.append(None)
+        return tuple(stamps)
+
+    def changed(self) -> bool:
+        current = self.stamp()
+        if current == self._stamp:
+            return False
+        self._stamp = current
+        return True
+
+    def build(self, staged: List[Tuple[Dict[str, Dict], List[Tuple[str, str, str]]]] = ()) -> Vocabulary:
+        with self.lock:
+            words, mistakes = dict(self.words), list(self.mistakes)
+        for staged_words, staged_mistakes in staged:
+            words.update(staged_words)
+            mistakes.extend(staged_mistakes)
+        strategy = getattr(serving.vocab, "index_strategy", "symdel")
+        if self.compiled_path and not words and not mistakes:
+            return CompiledVocabulary(self.compiled_path)
+        if self.compiled_path:
+            base = CompiledVocabulary(self.compiled_path)
+            try:
+                data = {w: dict(base.get(w)) for w in base.all_words()}
+            finally:
+                base.close()
+        else:
+            data = read_vocabulary_source(self.source_path) if self.source_path else build_builtin_vocab()
+        for word, meta in words.items():
+            meta = data[word] = dict(meta)
+            if meta.get("phonetic") is None:
+                meta["phonetic"] = phonetic_code(word.lower()) if meta.get("lang") == "english" else ""
+        for word, incorrect, error_type in mistakes:
+            meta = data.get(word) or data.get(word.lower())
+            if meta is not None and not any(m.get("incorrect") == incorrect for m in meta.get("common_mistakes") or ()):
+                meta["common_mistakes"] = list(meta.get("common_mistakes") or []) + [{"incorrect": incorrect, "error_type": error_type}]
+        return Vocabulary(data, index_strategy=strategy)
+
+    def edit(self, words: Optional[Dict[str, Dict]] = None, mistakes: Optional[List[Tuple[str, str, str]]] = None):
+        if words or mistakes:
+            with self.lock:
+                self.staged.append((dict(words or {}), list(mistakes or ())))
+
+    def reload(self, wait: bool = False) -> Dict:
+        with self.lock:
+            if self.thread is not None:
+                self.pending = True
+            else:
+                self.thread = threading.Thread(target=self._run, name="effling-vocab-reload", daemon=True)
+                self.thread.start()
+            thread = self.thread
+        if wait and thread is not None:
+            thread.join()
+        return self.status()
+
+    def _run(self):
+        while True:
+            started = time.perf_counter()
+            with self.lock:
+                staged, self.staged = self.staged, []
+            try:
+                built = self.build(staged)
+            except Exception as exc:
+                app.logger.exception("vocabulary reload failed; still serving version %s", serving.version)
+                self.failures += 1
+                self.last = dict(self.last, error=f"{type(exc).__name__}: {exc}", finished=time.time())
+            else:
+                with self.lock:
+                    for staged_words, staged_mistakes in staged:
+                        self.words.update(staged_words)
+                        self.mistakes.extend(staged_mistakes)
+                install_vocabulary(built)
+                precomputed.refresh(built)
+                self.builds += 1
+                self.last = {"version": built.version, "words": len(built.all_words()), "seconds": round(time.perf_counter() - started, 3), "error": None, "finished": time.time()}
+            with self.lock:
+                if not self.pending:
+                    self.thread = None
+                    return
+                self.pending = False
+
+    def watch(self) -> bool:
+        if self.interval <= 0 or self._watcher is not None or not (self.compiled_path or self.source_path):
+            return False
+        def loop():
+            while True:
+                time.sleep(self.interval)
+                if self.changed():
+                    self.reload()
+        self._watcher = threading.Thread(target=loop, name="effling-vocab-watch", daemon=True)
+        self._watcher.start()
+        return True
+
+    def status(self) -> Dict:
+        with self.lock:
+            building = self.thread is not None
+            edits = {"words": len(self.words), "commonMistakes": len(self.mistakes)}
+        current = serving
+        return {"serving": {"version": current.version, "words": len(current.vocab.all_words()), "kind": type(current.vocab).__name__}, "building": building, "last": self.last, "builds": self.builds, "failures": self.failures, "edits": edits, "source": self.compiled_path or self.source_path or "builtin", "watchInterval": self.interval if self._watcher is not None else 0}
+
+reloader = VocabularyReloader()
+
+def reload_vocabulary() -> Vocabulary:
+    reloader.reload(wait=True)
+    return serving.vocab
+
+PRECOMPUTED_FILE = os.environ.get("EFFLING_PRECOMPUTED")
+PRECOMPUTE_FREQUENCY = os.environ.get("EFFLING_PRECOMPUTE_FREQUENCY", "high")
+PRECOMPUTED_MAGIC = b"EFMISS01"
+VOWELS = {"english": "aeiou"}
+CHILD_SUBSTITUTIONS = {
+    "english": [("ph", "f"), ("ck", "k"), ("c", "k"), ("tion", "shun"), ("ee", "ea"), ("ea", "ee"), ("ou", "ow"), ("igh", "i"), ("wh", "w"), ("kn", "n"), ("wr", "r"), ("y", "ie"), ("s", "z"), ("le", "el")],
+    "hindi": [("ि", "ी"), ("ी", "ि"), ("ु", "ू"), ("ू", "ु"), ("े", "ै"), ("ै", "े"), ("ं", ""), ("़", ""), ("भ", "ब"), ("ध", "द"), ("थ", "त"), ("ख", "क"), ("घ", "ग"), ("श", "स"), ("ष", "स")],
+}
+
+def likely_variants(word: str, language: Optional[str], meta: Optional[Mapping] = None) -> set:
+    clusters = grapheme_clusters(word)
+    out = {word[:i] + word[i + 1:] for i in range(len(word))}
+    for i in range(len(clusters)):
+        out.add("".join(clusters[:i] + clusters[i + 1:]))
+        out.add("".join(clusters[:i + 1] + clusters[i:]))
+        if i + 1 < len(clusters):
+            out.add("".join(clusters[:i] + (clusters[i + 1], clusters[i]) + clusters[i + 2:]))
+        vowels = VOWELS.get(language, "")
+        if clusters[i] in vowels:
+            out.update("".join(clusters[:i] + (v,) + clusters[i + 1:]) for v in vowels if v != clusters[i])
+    for a, b in CHILD_SUBSTITUTIONS.get(language, ()):
+        start = word.find(a)
+        while start >= 0:
+            out.add(word[:start] + b + word[start + len(a):])
+            start = word.find(a, start + 1)
+    for m in (meta or {}).get("common_mistakes") or ():
+        out.add(m["incorrect"])
+    out.discard(word)
+    out.discard("")
+    return out
+
+def vocabulary_fingerprint(source: Vocabulary) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([INDEX_MAX_DISTANCE, PHONETIC_CONSENSUS, sorted(PHONETIC_KEYS)]).encode())
+    for w in sorted(source.all_words()):
+        digest.update(json.dumps([w, dict(source.get(w))], sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+def partition_key(language: Optional[str], age_level: Optional[str]) -> str:
+    return f"{language or ''}|{age_level or ''}"
+
+def build_misspelling_table(source: Vocabulary, path: str, frequency: Optional[str] = PRECOMPUTE_FREQUENCY) -> Dict:
+    started = time.perf_counter()
+    live = MistakeAnalyzer(source)
+    groups: Dict[Tuple[str, Optional[str]], List[str]] = {}
+    for w in source.all_words():
+        meta = source.get(w)
+        if frequency and meta.get("frequency") != frequency:
+            continue
+        for age in (meta.get("age_level"), None):
+            groups.setdefault((meta.get("lang"), age), []).append(w)
+    out = _SectionWriter()
+    partitions: Dict[str, Dict] = {}
+    entries = 0
+    for p, ((language, age), words) in enumerate(sorted(groups.items(), key=lambda kv: partition_key(*kv[0]))):
+        profile = {"language": language, "ageGroup": age}
+        table: Dict[str, str] = {}
+        for w in words:
+            for miss in likely_variants(query_form(w, language), language, source.get(w)):
+                if miss in table or source.exists(miss, language=language, age_level=age):
+                    continue
+                result = word_evaluation(live.suggester.get_suggestions(miss, language, age, 4), live.analyze_mistake(miss, profile))
+                table[miss] = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+        keys = sorted(table)
+        out.strings(f"keys.{p}", keys)
+        out.strings(f"values.{p}", [table[k] for k in keys])
+        partitions[partition_key(language, age)] = {"index": p, "words": len(words), "entries": len(keys)}
+        entries += len(keys)
+    seconds = round(time.perf_counter() - started, 3)
+    header = {"format": 1, "byteorder": sys.byteorder, "fingerprint": vocabulary_fingerprint(source), "frequency": frequency, "entries": entries, "seconds": seconds, "partitions": partitions, "sections": out.sections}
+    head = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    prefix = PRECOMPUTED_MAGIC + struct.pack("<Q", len(head)) + head
+    prefix += b"\0" * ((-len(prefix)) % 8)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as fh:
+        fh.write(prefix)
+        for part in out.parts:
+            fh.write(part)
+    os.replace(tmp, path)
+    return {"path": path, "entries": entries, "partitions": len(partitions), "bytes": len(prefix) + out.size, "seconds": seconds}
+
+class MisspellingTable:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(PRECOMPUTED_MAGIC)] != PRECOMPUTED_MAGIC:
+            raise ValueError(f"{path} is not a precomputed misspelling table")
+        (hlen,) = struct.unpack_from("<Q", self._mm, len(PRECOMPUTED_MAGIC))
+        start = len(PRECOMPUTED_MAGIC) + 8
+        self.header = json.loads(self._mm[start:start + hlen].decode("utf-8"))
+        if self.header.get("format") != 1 or self.header.get("byteorder") != sys.byteorder:
+            raise ValueError(f"{path} was built for an incompatible format or byte order")
+        self.fingerprint = self.header["fingerprint"]
+        body = start + hlen + ((-(start + hlen)) % 8)
+        view = memoryview(self._mm)
+        def strings(name):
+            off, length = self.header["sections"][name + ".off"]
+            boff, blength = self.header["sections"][name + ".blob"]
+            return _StringTable(view[body + off:body + off + length].cast("I"), view[body + boff:body + boff + blength])
+        self.tables = {key: (strings(f"keys.{part['index']}"), strings(f"values.{part['index']}")) for key, part in self.header["partitions"].items()}
+
+    def __len__(self) -> int:
+        return self.header["entries"]
+
+    def get(self, word: str, language: Optional[str], age_level: Optional[str]) -> Optional[Dict]:
+        found = self.tables.get(partition_key(language, age_level))
+        if found is None:
+            return None
+        keys, values = found
+        raw = word.encode("utf-8")
+        i = keys.bisect(raw)
+        if i < len(keys) and keys.raw(i) == raw:
+            return json.loads(values.raw(i))
+        return None
+
+class PrecomputedAnalyses:
+    def __init__(self, path: Optional[str] = PRECOMPUTED_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.table: Optional[MisspellingTable] = None
+        self.version: Optional[int] = None
+        self.built: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.hits = self.misses = self.stale = 0
+
+    def lookup(self, word: str, language: Optional[str], age_level: Optional[str], current: Vocabulary) -> Optional[Dict]:
+        table = self.table
+        if table is None:
+            return None
+        if current.version != self.version:
+            self.stale += 1
+            return None
+        result = table.get(word, language, age_level)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def warm(self, source: Vocabulary, wait: bool = False) -> Optional[threading.Thread]:
+        if not self.path:
+            return None
+        thread = threading.Thread(target=self.refresh, args=(source,), name="effling-precompute", daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+        return thread
+
+    def refresh(self, source: Vocabulary):
+        if not self.path:
+            return
+        with self.lock:
+            try:
+                fingerprint = vocabulary_fingerprint(source)
+                try:
+                    table = MisspellingTable(self.path)
+                except (OSError, ValueError):
+                    table = None
+                if table is None or table.fingerprint != fingerprint:
+                    self.built = build_misspelling_table(source, self.path)
+                    table = MisspellingTable(self.path)
+                self.table, self.version, self.error = table, source.version, None
+            except Exception as exc:
+                app.logger.exception("precomputing misspelling analyses failed; serving live results")
+                self.error = f"{type(exc).__name__}: {exc}"
+
+    def stats(self) -> Dict:
+        table = self.table
+        lookups = self.hits + self.misses
+        return {"path": self.path, "loaded": table is not None, "current": table is not None and self.version == serving.version, "entries": len(table) if table is not None else 0, "bytes": len(table._mm) if table is not None else 0, "partitions": {k: v["entries"] for k, v in table.header["partitions"].items()} if table is not None else {}, "buildSeconds": table.header["seconds"] if table is not None else None, "built": self.built, "error": self.error, "hits": self.hits, "misses": self.misses, "stale": self.stale, "hitRate": round(self.hits / lookups, 4) if lookups else 0.0}
+
+precomputed = PrecomputedAnalyses()
+
+OFFLOAD_WORKERS = int(os.environ.get("EFFLING_OFFLOAD_WORKERS", "0"))
+OFFLOAD_COST = int(os.environ.get("EFFLING_OFFLOAD_COST", "400"))
+OFFLOAD_GRACE = 0.05
+REQUEST_DEADLINE = float(os.environ.get("EFFLING_REQUEST_DEADLINE", "0"))
+
+def suggestion_cost(word: str, language: Optional[str], source: Vocabulary) -> int:
+    word = word or ""
+    return len(word) ** 2 * len(source._languages(language)) * (1 if word.isascii() else 8)
+
+OFFLOAD_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+def vocabulary_spec(source: Vocabulary) -> Tuple[Optional[str], Optional[Dict[str, Dict]], str]:
+    if isinstance(source, CompiledVocabulary):
+        return source.path, None, source.index_strategy
+    return None, {w: dict(source.get(w)) for w in source.all_words()}, source.index_strategy
+
+def _offload_init(path: Optional[str], data: Optional[Dict[str, Dict]], index_strategy: str):
+    global suggestion_cache
+    for sig in (signal.SIGHUP, signal.SIGINT):
+        signal.signal(sig, signal.SIG_IGN)
+    suggestion_cache = LRUCache(CACHE_MAXSIZE, CACHE_TTL)
+    install_vocabulary(load_vocabulary(path, data, index_strategy))
+
+def _offload_analyze(word: str, language: Optional[str], child_profile: dict, deadline: Optional[float]) -> Tuple[List[Dict], Dict, bool]:
+    current = serving.analyzer
+    ranked = current.suggester.ranked(word, language, child_profile.get("ageGroup"), deadline)
+    analysis = current.analyze_mistake(word, child_profile, deadline)
+    return ranked, analysis, not expired(deadline)
+
+class SuggestionOffload:
+    def __init__(self, workers: int = OFFLOAD_WORKERS, threshold: int = OFFLOAD_COST, deadline: float = REQUEST_DEADLINE):
+        self.workers = workers
+        self.threshold = threshold
+        self.deadline = deadline
+        self.lock = threading.Lock()
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self._owner = None
+        self.stats_lock = threading.Lock()
+        self.inline = self.offloaded = self.timeouts = self.partial = 0
+
+    def _count(self, name: str):
+        with self.stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def executor(self, current: VocabularySnapshot) -> ProcessPoolExecutor:
+        owner = (os.getpid(), current.version)
+        with self.lock:
+            if self.pool is None or self._owner != owner:
+                if self.pool is not None and self._owner[0] == owner[0]:
+                    self.pool.shutdown(wait=False)
+                self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(OFFLOAD_START_METHOD), initializer=_offload_init, initargs=vocabulary_spec(current.vocab))
+                self._owner = owner
+            return self.pool
+
+    def start(self):
+        if self.workers > 0:
+            self.executor(serving).submit(int).result()
+
+    def wants(self, word: str, language: Optional[str], child_profile: dict, current: VocabularySnapshot) -> bool:
+        if self.workers <= 0 or suggestion_cost(word, language, current.vocab) <= self.threshold:
+            return False
+        version = current.version
+        return not (suggestion_cache.peek(SpellingSuggester.key(word, language, child_profile.get("ageGroup")), version) and suggestion_cache.peek(MistakeAnalyzer.key(word, child_profile), version))
+
+    def analyze(self, word: str, language: Optional[str], child_profile: dict, max_suggestions: int = 4, current: Optional[VocabularySnapshot] = None) -> Tuple[List[Dict], Dict]:
+        deadline = time.monotonic() + self.deadline if self.deadline > 0 else None
+        current = current or serving
+        if self.wants(word, language, child_profile, current):
+            self._count("offloaded")
+            try:
+                future = self.executor(current).submit(_offload_analyze, word, language, dict(child_profile), deadline)
+                ranked, analysis, complete = future.result(None if deadline is None else max(0.0, deadline - time.monotonic()) + OFFLOAD_GRACE)
+            except FuturesTimeout:
+                future.cancel()
+                self._count("timeouts")
+                deadline = time.monotonic()
+            except BrokenExecutor:
+                with self.lock:
+                    self.pool = None
+            except (CancelledError, RuntimeError):
+                pass
+            else:
+                if complete:
+                    current.analyzer.suggester.remember(word, language, child_profile.get("ageGroup"), ranked)
+                    current.analyzer.remember(word, child_profile, analysis)
+                else:
+                    self._count("partial")
+                return ranked[:max_suggestions], analysis
+        self._count("inline")
+        return current.analyzer.suggester.get_suggestions(word, language, child_profile.get("ageGroup"), max_suggestions, deadline), current.analyzer.analyze_mistake(word, child_profile, deadline)
+
+    def stats(self) -> Dict:
+        with self.stats_lock:
+            return {"workers": self.workers, "threshold": self.threshold, "deadline": self.deadline, "inline": self.inline, "offloaded": self.offloaded, "timeouts": self.timeouts, "partial": self.partial}
+
+offload = SuggestionOffload()
+
+ATTEMPT_HISTORY = int(os.environ.get("EFFLING_ATTEMPT_HISTORY", "1000"))
+SESSION_POINTS = 300
+ATTEMPT_LOG_PATH = os.environ.get("EFFLING_ATTEMPT_LOG")
+SESSION_SHARDS = int(os.environ.get("EFFLING_SESSION_SHARDS", "32"))
+SESSION_IDLE_TTL = float(os.environ.get("EFFLING_SESSION_IDLE_TTL", "3600"))
+ANALYTICS_DB = os.environ.get("EFFLING_ANALYTICS_DB")
+ANALYTICS_QUEUE = int(os.environ.get("EFFLING_ANALYTICS_QUEUE", "10000"))
+ANALYTICS_BATCH = int(os.environ.get("EFFLING_ANALYTICS_BATCH", "500"))
+ANALYTICS_FLUSH_INTERVAL = float(os.environ.get("EFFLING_ANALYTICS_FLUSH", "1.0"))
+ANALYTICS_BLOCK = float(os.environ.get("EFFLING_ANALYTICS_BLOCK", "0"))
+
+Attempt = Tuple[str, str, bool, Tuple[str, ...]]
+
+class PointSeries:
+    def __init__(self, maxlen: int = SESSION_POINTS):
+        self.points = deque(maxlen=maxlen)
+        self.seq = 0
+        self._encoded: Tuple[int, bytes] = (-1, b"")
+
+    def append(self, point: Dict):
+        self.points.append(point)
+        self.seq += 1
+
+    def view(self, cursor: Optional[int] = None, since_ts: Optional[int] = None) -> Tuple[Optional[List[Dict]], Optional[bytes], int, bool]:
+        if cursor is not None:
+            first = self.seq - len(self.points)
+            if first <= cursor <= self.seq:
+                return list(itertools.islice(self.points, cursor - first, None)), None, self.seq, False
+            return list(self.points), None, self.seq, cursor > 0
+        if since_ts is not None:
+            fresh = list(itertools.takewhile(lambda p: p["ts"] > since_ts, reversed(self.points)))
+            return fresh[::-1], None, self.seq, False
+        seq, encoded = self._encoded
+        if seq == self.seq:
+            return None, encoded, seq, False
+        return list(self.points), None, self.seq, False
+
+    def remember(self, seq: int, encoded: bytes):
+        if seq > self._encoded[0]:
+            self._encoded = (seq, encoded)
+
+class SessionStats:
+    def __init__(self):
+        self.attempts = deque(maxlen=ATTEMPT_HISTORY)
+        self.series = PointSeries(SESSION_POINTS)
+        self.total = 0
+        self.correct = 0
+        self.error_types: Dict[str, int] = {}
+        self.last_seen = time.monotonic()
+
+    @property
+    def points(self) -> deque:
+        return self.series.points
+
+    def record(self, record: Dict, errors: Tuple[str, ...] = ()):
+        self.attempts.append(record)
+        self.total += 1
+        if record["correct"]:
+            self.correct += 1
+        for e in errors:
+            self.error_types[e] = self.error_types.get(e, 0) + 1
+        self.series.append({"ts": record["ts"], "accuracy": round((self.correct / self.total) * 100, 1)})
+        self.last_seen = time.monotonic()
+
+    def snapshot(self, recent: int = 50) -> Dict:
+        return {"attempts": list(itertools.islice(reversed(self.attempts), recent))[::-1], "totals": {"total": self.total, "correct": self.correct, "accuracy": round((self.correct / self.total) * 100, 1) if self.total else None}, "errorTypes": dict(self.error_types)}
+
+def encode_series(series: PointSeries, view, full: bool = False) -> bytes:
+    points, encoded, seq, reset = view
+    if encoded is None:
+        encoded = json.dumps(points, separators=(",", ":")).encode()
+        if full:
+            series.remember(seq, encoded)
+    return b'"sessionPoints":' + encoded + b',"cursor":' + str(seq).encode() + (b',"reset":true' if reset else b"")
+
+EMPTY_SERIES = PointSeries(SESSION_POINTS)
+
+class SessionStore:
+    def __init__(self, shards: int = SESSION_SHARDS, idle_ttl: float = SESSION_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self.evicted = 0
+        self._shards: List[Tuple[Dict[str, SessionStats], threading.Lock]] = [({}, threading.Lock()) for _ in range(max(1, shards))]
+        self._swept = [time.monotonic()] * len(self._shards)
+
+    def _shard(self, session_id: str) -> int:
+        return hash(session_id) % len(self._shards)
+
+    def record(self, session_id: str, records: List[Dict], errors: List[Tuple[str, ...]], cursor: Optional[int] = None, since_ts: Optional[int] = None) -> bytes:
+        i = self._shard(session_id)
+        sessions, lock = self._shards[i]
+        metrics.acquire(lock, "session")
+        try:
+            stats = sessions.get(session_id)
+            if stats is None:
+                stats = sessions[session_id] = SessionStats()
+            for record, errs in zip(records, errors):
+                stats.record(record, errs)
+            view = stats.series.view(cursor, since_ts)
+            now = time.monotonic()
+            if now - self._swept[i] > self.idle_ttl / 4:
+                self._sweep(i, now)
+        finally:
+            lock.release()
+        return encode_series(stats.series, view, cursor is None and since_ts is None)
+
+    def _sweep(self, i: int, now: float):
+        sessions, _ = self._shards[i]
+        idle = [sid for sid, st in sessions.items() if now - st.last_seen > self.idle_ttl]
+        for sid in idle:
+            del sessions[sid]
+        self.evicted += len(idle)
+        self._swept[i] = now
+
+    def snapshot(self, session_id: str, recent: int = 50) -> Optional[Tuple[Dict, bytes]]:
+        sessions, lock = self._shards[self._shard(session_id)]
+        with lock:
+            stats = sessions.get(session_id)
+            if stats is None:
+                return None
+            snap, view = stats.snapshot(recent), stats.series.view()
+        return snap, encode_series(stats.series, view, True)
+
+    def series(self, session_id: str, cursor: Optional[int] = None, since_ts: Optional[int] = None) -> bytes:
+        sessions, lock = self._shards[self._shard(session_id)]
+        with lock:
+            stats = sessions.get(session_id)
+            series = stats.series if stats is not None else EMPTY_SERIES
+            view = series.view(cursor, since_ts)
+        return encode_series(series, view, cursor is None and since_ts is None)
+
+    def sweep(self):
+        now = time.monotonic()
+        for i, (_, lock) in enumerate(self._shards):
+            with lock:
+                self._sweep(i, now)
+
+    def __len__(self) -> int:
+        return sum(len(sessions) for sessions, _ in self._shards)
+
+class AttemptLog:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def append(self, records: List[Dict]):
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with self._lock:
+            self._fh.write(lines)
+            self._fh.flush()
+
+    def close(self):
+        with self._lock:
+            self._fh.close()
+
+ATTEMPT_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS attempts (id INTEGER PRIMARY KEY, ts INTEGER NOT NULL, child TEXT, word TEXT NOT NULL, intended TEXT, correct INTEGER NOT NULL, errors TEXT NOT NULL DEFAULT '')",
+    "CREATE INDEX IF NOT EXISTS attempts_child_word_ts ON attempts (child, word, ts)",
+    "CREATE INDEX IF NOT EXISTS attempts_child_ts ON attempts (child, ts)",
+    "CREATE INDEX IF NOT EXISTS attempts_word_ts ON attempts (word, ts)",
+    "CREATE INDEX IF NOT EXISTS attempts_ts ON attempts (ts)",
+)
+class AttemptDatabase:
+    def __init__(self, path: str, capacity: int = ANALYTICS_QUEUE, batch: int = ANALYTICS_BATCH, interval: float = ANALYTICS_FLUSH_INTERVAL, block: float = ANALYTICS_BLOCK):
+        self.path = path
+        self.capacity = capacity
+        self.batch = max(1, batch)
+        self.interval = interval
+        self.block = block
+        self.written = self.dropped = self.failed = self.batches = 0
+        self._readers = threading.local()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        with self._connect() as db:
+            for statement in ATTEMPT_SCHEMA:
+                db.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _writer(self) -> queue.Queue:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(self.capacity)
+                    self._thread = threading.Thread(target=self._run, args=(self._queue,), name="effling-analytics-db", daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+                    atexit.register(self.flush)
+        return self._queue
+
+    def enqueue(self, records: List[Dict], errors: List[Tuple[str, ...]], session_id: Optional[str] = None):
+        pending = self._writer()
+        for record, errs in zip(records, errors):
+            row = (record["ts"], session_id, record["word"], record["intended"], int(bool(record["correct"])), ",".join(errs))
+            try:
+                if self.block > 0:
+                    pending.put(row, timeout=self.block)
+                else:
+                    pending.put_nowait(row)
+            except queue.Full:
+                self.dropped += 1
+
+    def _run(self, pending: queue.Queue):
+        db = self._connect()
+        while True:
+            item = pending.get()
+            rows, done = [], None
+            deadline = time.monotonic() + self.interval
+            while True:
+                if isinstance(item, threading.Event):
+                    done = item
+                    break
+                rows.append(item)
+                if len(rows) >= self.batch:
+                    break
+                try:
+                    item = pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if rows:
+                try:
+                    with db:
+                        db.executemany("INSERT INTO attempts (ts, child, word, intended, correct, errors) VALUES (?, ?, ?, ?, ?, ?)", rows)
+                    self.written += len(rows)
+                    self.batches += 1
+                except sqlite3.Error:
+                    app.logger.exception("dropping %d analytics rows after a failed write to %s", len(rows), self.path)
+                    self.failed += len(rows)
+            if done is not None:
+                done.set()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        if self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _reader(self) -> sqlite3.Connection:
+        db = getattr(self._readers, "db", None)
+        if db is None:
+            db = self._readers.db = sqlite3.connect(self.path, timeout=30)
+        return db
+
+    def history(self, child: Optional[str] = None, word: Optional[str] = None, since_ts: Optional[int] = None, until_ts: Optional[int] = None, top: int = 10) -> Dict:
+        clauses, params = ["child IS ?"], [child]
+        if word:
+            clauses.append("word = ?")
+            params.append(word)
+        if since_ts is not None:
+            clauses.append("ts >= ?")
+            params.append(since_ts)
+        if until_ts is not None:
+            clauses.append("ts < ?")
+            params.append(until_ts)
+        where = " AND ".join(clauses)
+        db = self._reader()
+        total, correct, first, last = db.execute(f"SELECT COUNT(*), COALESCE(SUM(correct), 0), MIN(ts), MAX(ts) FROM attempts WHERE {where}", params).fetchone()
+        error_types: Dict[str, int] = {}
+        for errors, n in db.execute(f"SELECT errors, COUNT(*) FROM attempts WHERE {where} AND errors != '' GROUP BY errors", params):
+            for e in errors.split(","):
+                error_types[e] = error_types.get(e, 0) + n
+        words = [{"word": w, "attempts": n, "correct": c, "accuracy": round(c / n * 100, 1)} for w, n, c in db.execute(f"SELECT word, COUNT(*) AS n, SUM(correct) FROM attempts WHERE {where} GROUP BY word ORDER BY n - SUM(correct) DESC, n DESC LIMIT ?", params + [top])]
+        daily = [{"day": d, "total": n, "correct": c, "accuracy": round(c / n * 100, 1)} for d, n, c in db.execute(f"SELECT date(ts, 'unixepoch') AS d, COUNT(*), SUM(correct) FROM attempts WHERE {where} GROUP BY d ORDER BY d", params)]
+        return {"totals": {"total": total, "correct": correct, "accuracy": round(correct / total * 100, 1) if total else None}, "firstTs": first, "lastTs": last, "errorTypes": error_types, "words": words, "daily": daily}
+
+    def stats(self) -> Dict:
+        depth = self._queue.qsize() if self._pid == os.getpid() else 0
+        return {"path": self.path, "queued": depth, "capacity": self.capacity, "written": self.written, "batches": self.batches, "dropped": self.dropped, "failed": self.failed}
+
+class AnalyticsStore:
+    def __init__(self, log_path: Optional[str] = ATTEMPT_LOG_PATH, shards: int = SESSION_SHARDS, idle_ttl: float = SESSION_IDLE_TTL, db_path: Optional[str] = ANALYTICS_DB):
+        self.lock = threading.Lock()
+        self.analytics = SessionStats()
+        self.sessions = SessionStore(shards, idle_ttl)
+        self.attempt_log = AttemptLog(log_path) if log_path else None
+        self.attempt_db = AttemptDatabase(db_path) if db_path else None
+
+    def record(self, records: List[Dict], errors: List[Tuple[str, ...]], session_id: Optional[str] = None, cursor: Optional[int] = None, since_ts: Optional[int] = None) -> bytes:
+        if session_id is not None:
+            fragment = self.sessions.record(session_id, records, errors, cursor, since_ts)
+        else:
+            metrics.acquire(self.lock)
+            try:
+                for record, errs in zip(records, errors):
+                    self.analytics.record(record, errs)
+                view = self.analytics.series.view(cursor, since_ts)
+            finally:
+                self.lock.release()
+            fragment = encode_series(self.analytics.series, view, cursor is None and since_ts is None)
+        if self.attempt_log is not None:
+            self.attempt_log.append([dict(r, session=session_id) for r in records] if session_id is not None else records)
+        if self.attempt_db is not None:
+            self.attempt_db.enqueue(records, errors, session_id)
+        return fragment
+
+    def series(self, session_id: Optional[str] = None, cursor: Optional[int] = None, since_ts: Optional[int] = None) -> bytes:
+        if session_id is not None:
+            return self.sessions.series(session_id, cursor, since_ts)
+        with self.lock:
+            view = self.analytics.series.view(cursor, since_ts)
+        return encode_series(self.analytics.series, view, cursor is None and since_ts is None)
+
+    def snapshot(self, session_id: Optional[str] = None) -> Optional[Tuple[Dict, bytes]]:
+        if session_id is not None:
+            return self.sessions.snapshot(session_id)
+        with self.lock:
+            snap, view = self.analytics.snapshot(), self.analytics.series.view()
+        return snap, encode_series(self.analytics.series, view, True)
+
+    def lock_waits(self) -> Dict[str, List[float]]:
+        with metrics.lock:
+            return {name: list(w) for name, w in metrics.lock_waits.items()}
+
+    def history(self, session_id: Optional[str] = None, word: Optional[str] = None, since_ts: Optional[int] = None, until_ts: Optional[int] = None) -> Optional[Dict]:
+        if self.attempt_db is None:
+            return None
+        return self.attempt_db.history(session_id, word, since_ts, until_ts)
 
-analyzer = MistakeAnalyzer(vocab)
+    def persistence(self) -> Optional[Dict]:
+        return self.attempt_db.stats() if self.attempt_db is not None else None
 
-analytics_lock = threading.Lock()
-analytics = {"attempts": [], "session_points": []}
+    def close(self):
+        if self.attempt_db is not None:
+            self.attempt_db.flush()
+        if self.attempt_log is not None:
+            self.attempt_log.close()
 
-def record_attempt(word: str, intended: str, correct: bool):
+class AnalyticsManager(BaseManager):
+    pass
+
+AnalyticsManager.register("AnalyticsStore", AnalyticsStore, exposed=("record", "series", "snapshot", "lock_waits", "history", "persistence", "close"))
+
+analytics_store = AnalyticsStore()
+
+def session_key(payload: dict, child_profile: Optional[dict] = None) -> Optional[str]:
+    child_profile = child_profile or {}
+    sid = payload.get("sessionId") or child_profile.get("sessionId") or child_profile.get("childId")
+    return str(sid) if sid not in (None, "") else None
+
+def series_cursor(payload: dict) -> Tuple[Optional[int], Optional[int]]:
+    def as_int(v):
+        try:
+            return int(v) if v not in (None, "") else None
+        except (TypeError, ValueError):
+            return None
+    return as_int(payload.get("cursor")), as_int(payload.get("sinceTs"))
+
+def record_attempt(word: str, intended: str, correct: bool, errors: Tuple[str, ...] = (), session_id: Optional[str] = None, cursor: Optional[int] = None, since_ts: Optional[int] = None) -> bytes:
+    return record_attempts([(word, intended, correct, tuple(errors))], session_id, cursor, since_ts)
+
+def record_attempts(attempts: List[Attempt], session_id: Optional[str] = None, cursor: Optional[int] = None, since_ts: Optional[int] = None) -> bytes:
+    if not attempts:
+        return session_series(session_id, cursor, since_ts)
     ts = int(time.time())
-    with analytics_lock:
-        analytics["attempts"].append({"ts": ts, "word": word, "intended": intended, "correct": correct})
-        total = len(analytics["attempts"])
-        correct_count = sum(1 for a in analytics["attempts"] if a["correct"])
-        accuracy = round((correct_count / total) * 100, 1)
-        analytics["session_points"].append({"ts": ts, "accuracy": accuracy})
-        analytics["session_points"] = analytics["session_points"][-300:]
+    records = [{"ts": ts, "word": word, "intended": intended, "correct": correct} for word, intended, correct, _ in attempts]
+    return analytics_store.record(records, [a[3] for a in attempts], session_id, cursor, since_ts)
 
-@app.route("/api/v1/spelling/validate", methods=["POST"])
-def api_validate():
-    payload = request.get_json() or {}
+def session_series(session_id: Optional[str] = None, cursor: Optional[int] = None, since_ts: Optional[int] = None) -> bytes:
+    return analytics_store.series(session_id, cursor, since_ts)
+
+def analytics_members(series_members: bytes) -> bytes:
+    return b'"analytics":{' + series_members + b"}"
+
+def json_bytes(body: Dict, members: bytes = b"", compact: Optional[bool] = None) -> bytes:
+    started = metrics.start()
+    if compact is None:
+        compact = app.json.compact if app.json.compact is not None else not app.debug
+    data = app.json.dumps(body, separators=(",", ":")).encode() if compact else app.json.dumps(body, indent=2).encode()
+    data = data + b"\n" if not members else data[:-1] + (b"," if len(data) > 2 else b"") + members + b"}\n"
+    metrics.lap("serialize", started)
+    return data
+
+def json_with_members(body: Dict, members: bytes, status: int = 200) -> Response:
+    return Response(json_bytes(body, members), status=status, mimetype="application/json")
+
+MAX_BATCH_WORDS = 500
+
+def query_form(raw_word: str, language: str) -> str:
+    return raw_word if language == "hindi" else raw_word.lower()
+
+def evaluate_word(query_word: str, language: str, child_profile: dict, current: Optional[VocabularySnapshot] = None) -> Dict:
+    current = current or serving
+    age_group = child_profile.get("ageGroup")
+    started = metrics.start()
+    known = current.vocab.exists(query_word, language=language, age_level=age_group)
+    metrics.lap("exists", started)
+    if known:
+        return {"isCorrect": True, "intended": query_word, "suggestions": [], "mistakes": []}
+    started = metrics.start()
+    result = precomputed.lookup(query_word, language, age_group, current.vocab)
+    metrics.lap("precomputed", started)
+    if result is not None:
+        return result
+    suggestions, mistake_analysis = offload.analyze(query_word, language, child_profile, max_suggestions=4, current=current)
+    return word_evaluation(suggestions, mistake_analysis)
+
+def validation_body(raw_word: str, result: Dict) -> Dict:
+    if result["isCorrect"]:
+        return {"isCorrect": True, "writtenWord": raw_word, "suggestions": [], "mistakes": [], "feedback": {"type":"correct", "message": f"Great! You spelled '{raw_word}' correctly!"}}
+    suggestions = result["suggestions"]
+    return {"isCorrect": False, "writtenWord": raw_word, "suggestions": suggestions, "mistakes": result["mistakes"], "feedback": {"type":"incorrect", "message": f"Good try — maybe you meant '{suggestions[0]['word'] if suggestions else result['intended']}'"}}
+
+def parse_validation(payload: dict) -> Tuple[str, str, dict, str]:
     raw_word = payload.get("word") or ""
     language = (payload.get("language") or "english").lower()
     child_profile = payload.get("childProfile") or {}
     child_profile["language"] = language
-    age_group = child_profile.get("ageGroup")
-    query_word = raw_word if language == "hindi" else raw_word.lower()
-    if vocab.exists(query_word, language=language, age_level=age_group):
-        record_attempt(query_word, query_word, True)
-        return jsonify({"isCorrect": True, "writtenWord": raw_word, "suggestions": [], "mistakes": [], "feedback": {"type":"correct", "message": f"Great! You spelled '{raw_word}' correctly!"}, "analytics": {"sessionPoints": analytics["session_points"]}})
-    suggester = SpellingSuggester(vocab)
-    suggestions = suggester.get_suggestions(query_word, language=language, age_level=age_group, max_suggestions=4)
-    mistake_analysis = analyzer.analyze_mistake(query_word, child_profile)
-    intended = mistake_analysis.get("intended_word") or (suggestions[0]["word"] if suggestions else "")
-    record_attempt(query_word, intended, False)
-    visual_mistakes = []
-    for p in mistake_analysis["positions"]:
-        visual_mistakes.append({"position_written": p.get("position_written"), "position_correct": p.get("position_correct"), "type": p.get("error_type"), "written": p.get("written"), "correct": p.get("correct")})
-    return jsonify({"isCorrect": False, "writtenWord": raw_word, "suggestions": suggestions, "mistakes": visual_mistakes, "feedback": {"type":"incorrect", "message": f"Good try — maybe you meant '{suggestions[0]['word'] if suggestions else intended}'"}, "analytics": {"sessionPoints": analytics["session_points"]}})
+    return raw_word, language, child_profile, query_form(raw_word, language)
 
-@app.route("/api/v1/spelling/analyze-progress", methods=["POST"])
-def api_analyze_progress():
+def validation_response(payload: dict, raw_word: str, query_word: str, child_profile: dict, result: Dict) -> Tuple[Dict, bytes]:
+    cursor, since_ts = series_cursor(payload)
+    started = metrics.start()
+    fragment = record_attempt(query_word, result["intended"], result["isCorrect"], error_types(result), session_key(payload, child_profile), cursor, since_ts)
+    metrics.lap("record_attempt", started)
+    return validation_body(raw_word, result), analytics_members(fragment)
+
+@app.route("/api/v1/spelling/validate", methods=["POST"])
+def api_validate():
     payload = request.get_json() or {}
+    raw_word, language, child_profile, query_word = parse_validation(payload)
+    result = evaluate_word(query_word, language, child_profile)
+    return json_with_members(*validation_response(payload, raw_word, query_word, child_profile, result))
+
+def error_types(result: Dict) -> Tuple[str, ...]:
+    return tuple(m["type"] for m in result["mistakes"])
+
+def validate_batch(raw_words: List[str], language: str, child_profile: dict, attempts: List[Attempt]):
+    current = serving
+    seen: Dict[str, Dict] = {}
+    for raw_word in raw_words:
+        raw_word = raw_word if isinstance(raw_word, str) else ""
+        query_word = query_form(raw_word, language)
+        result = seen.get(query_word)
+        if result is None:
+            result = seen[query_word] = evaluate_word(query_word, language, child_profile, current)
+        attempts.append((query_word, result["intended"], result["isCorrect"], error_types(result)))
+        yield validation_body(raw_word, result)
+
+@app.route("/api/v1/spelling/validate-batch", methods=["POST"])
+def api_validate_batch():
+    payload = request.get_json() or {}
+    words = payload.get("words") or []
+    if not isinstance(words, list):
+        return jsonify({"error": "words must be a list"}), 400
+    if len(words) > MAX_BATCH_WORDS:
+        return jsonify({"error": f"at most {MAX_BATCH_WORDS} words per batch"}), 413
+    language = (payload.get("language") or "english").lower()
+    child_profile = dict(payload.get("childProfile") or {})
+    child_profile["language"] = language
+    session_id = session_key(payload, child_profile)
+    cursor, since_ts = series_cursor(payload)
+    attempts: List[Attempt] = []
+    results = validate_batch(words, language, child_profile, attempts)
+    stream = payload.get("stream") or "application/x-ndjson" in (request.headers.get("Accept") or "")
+    if not stream:
+        body = {"results": list(results)}
+        return json_with_members(body, analytics_members(record_attempts(attempts, session_id, cursor, since_ts)))
+    def generate():
+        for body in results:
+            yield json_bytes(body, compact=True)
+        yield b"{" + analytics_members(record_attempts(attempts, session_id, cursor, since_ts)) + b"}\n"
+    return Response(generate(), mimetype="application/x-ndjson")
+
+PASSAGE_READ_SIZE = 8192
+
+def passage_chunks(stream, mimetype: str) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    if mimetype != "application/x-ndjson":
+        while True:
+            data = stream.read(PASSAGE_READ_SIZE)
+            if not data:
+                break
+            yield decoder.decode(data)
+        yield decoder.decode(b"", final=True)
+        return
+    for line in stream:
+        line = decoder.decode(line, final=True).strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            continue
+        text = item.get("text") if isinstance(item, dict) else item
+        if isinstance(text, str):
+            yield text
+
+@app.route("/api/v1/spelling/check-passage", methods=["POST"])
+def api_check_passage():
+    mimetype = request.mimetype
+    if mimetype == "application/json":
+        payload = request.get_json() or {}
+        text = payload.get("text")
+        if not isinstance(text, str):
+            return jsonify({"error": "text must be a string"}), 400
+        chunks: Iterable[str] = (text,)
+        child_profile = dict(payload.get("childProfile") or {})
+    else:
+        chunks = passage_chunks(request.stream, mimetype)
+        child_profile = {"ageGroup": request.args["ageGroup"]} if request.args.get("ageGroup") else {}
+    current = serving
+    results = PassageChecker(current.analyzer, lambda word, language, profile: evaluate_word(word, language, profile, current)).check(chunks, child_profile)
+    def generate():
+        for body in results:
+            yield json_bytes(body, compact=True)
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+def detect_language(text: str) -> str:
+    return "hindi" if any("\u0900" <= ch <= "\u097f" for ch in text or "") else "english"
+
+def progress_body(payload: dict) -> Dict:
     letters = payload.get("lettersWritten", []) or []
     expected = (payload.get("expectedWord") or "").strip()
     current = "".join(letters)
     if expected:
         remaining = list(expected[len(current):]) if len(expected) > len(current) else []
         status = "complete" if current == expected else "in_progress"
-        return jsonify({"status": status, "currentProgress": current, "remainingLetters": remaining, "isOnTrack": expected.startswith(current), "predictions": [{"word": expected, "confidence": 0.9}], "encouragement": "Keep going!"})
-    matches = [w for w in vocab.all_words() if w.startswith(current)] if current else []
-    predictions = [{"word": m, "confidence": round(1.0/(1 + len(m) - len(current)), 2)} for m in matches[:5]]
+        return {"status": status, "currentProgress": current, "remainingLetters": remaining, "isOnTrack": expected.startswith(current), "predictions": [{"word": expected, "confidence": 0.9}], "encouragement": "Keep going!"}
+    language = (payload.get("language") or detect_language(current)).lower()
+    matches = serving.vocab.complete(current, language=language, age_level=payload.get("ageGroup"), k=5)
+    predictions = [{"word": m, "confidence": round(1.0/(1 + len(m) - len(current)), 2)} for m in matches]
     remaining_letters = list(predictions[0]["word"][len(current):]) if predictions else []
-    return jsonify({"status": "in_progress" if remaining_letters else "complete", "currentProgress": current, "remainingLetters": remaining_letters, "isOnTrack": len(predictions) > 0, "predictions": predictions, "encouragement": "Nice work!"})
+    return {"status": "in_progress" if remaining_letters else "complete", "currentProgress": current, "remainingLetters": remaining_letters, "isOnTrack": len(predictions) > 0, "predictions": predictions, "encouragement": "Nice work!"}
+
+PROGRESS_SESSIONS = int(os.environ.get("EFFLING_PROGRESS_SESSIONS", "10000"))
+PROGRESS_SESSION_TTL = float(os.environ.get("EFFLING_PROGRESS_SESSION_TTL", "900"))
+
+class PrefixCursor:
+    __slots__ = ("vocab", "language", "age_level", "text", "stack", "predictions", "seq", "lock")
+
+    def __init__(self, vocab: Vocabulary, language: str, age_level: Optional[str]):
+        self.vocab = vocab
+        self.language = language
+        self.age_level = age_level
+        self.text = ""
+        self.stack: List[Tuple[str, Dict[str, Tuple[int, int]]]] = [("", vocab.prefix_ranges("", language))]
+        self.predictions: List[str] = []
+        self.seq = 0
+        self.lock = threading.Lock()
+
+    def move(self, text: str) -> Dict[str, Tuple[int, int]]:
+        key = text.lower()
+        while not key.startswith(self.stack[-1][0]):
+            self.stack.pop()
+        prefix, ranges = self.stack[-1]
+        for end in range(len(prefix) + 1, len(key) + 1):
+            ranges = self.vocab.prefix_ranges(key[:end], self.language, ranges)
+            self.stack.append((key[:end], ranges))
+        self.text = text
+        return ranges
+
+progress_cursors = LRUCache(PROGRESS_SESSIONS, PROGRESS_SESSION_TTL)
+
+def keystroke_progress(payload: dict) -> Tuple[int, Dict]:
+    sid = str(payload.get("progressSession") or secrets.token_urlsafe(9))
+    current = serving.vocab
+    cursor = progress_cursors.get(sid, current.version, None)
+    base, seq = (cursor.text, cursor.seq) if cursor is not None else ("", 0)
+    if "lettersWritten" in payload:
+        letters = payload.get("lettersWritten") or []
+        if not isinstance(letters, (str, list)) or not all(isinstance(ch, str) for ch in letters):
+            return 400, {"error": "lettersWritten must be a list of strings", "progressSession": sid, "seq": seq}
+        text = "".join(letters)
+    elif (payload.get("seq") or 0) != seq:
+        return 409, {"error": "progress session out of sync; resend lettersWritten", "progressSession": sid, "seq": seq}
+    else:
+        backspace, append = payload.get("backspace") or 0, payload.get("append") or ""
+        if isinstance(backspace, bool) or not isinstance(backspace, int) or backspace < 0 or not isinstance(append, str):
+            return 400, {"error": "backspace must be a non-negative integer and append a string", "progressSession": sid, "seq": seq}
+        text = base[:max(0, len(base) - backspace)] + append
+    language = (payload.get("language") or detect_language(text)).lower()
+    age_level = payload.get("ageGroup")
+    if cursor is None or (cursor.language, cursor.age_level) != (language, age_level):
+        cursor = PrefixCursor(current, language, age_level)
+    with cursor.lock:
+        known = payload.get("seq") == cursor.seq
+        ranges = cursor.move(text)
+        matches = current.complete(text, language=language, age_level=age_level, k=5, ranges=ranges)
+        keep = 0
+        if known:
+            while keep < min(len(matches), len(cursor.predictions)) and matches[keep] == cursor.predictions[keep]:
+                keep += 1
+        cursor.predictions = matches
+        cursor.seq += 1
+        seq = cursor.seq
+    progress_cursors.put(sid, cursor, current.version)
+    remaining_letters = list(matches[0][len(text):]) if matches else []
+    added = [{"word": m, "confidence": round(1.0/(1 + len(m) - len(text)), 2)} for m in matches[keep:]]
+    return 200, {"progressSession": sid, "seq": seq, "status": "in_progress" if remaining_letters else "complete", "currentProgress": text, "remainingLetters": remaining_letters, "isOnTrack": len(matches) > 0, "predictions": {"keep": keep, "add": added}, "encouragement": "Nice work!"}
+
+@app.route("/api/v1/spelling/analyze-progress", methods=["POST"])
+def api_analyze_progress():
+    payload = request.get_json() or {}
+    if "progressSession" in payload and not (payload.get("expectedWord") or "").strip():
+        status, body = keystroke_progress(payload)
+        return jsonify(body), status
+    return jsonify(progress_body(payload))
+
+@app.before_request
+def metrics_begin():
+    if metrics.enabled:
+        request.environ["effling.started"] = time.perf_counter_ns()
+
+@app.after_request
+def metrics_end(response: Response) -> Response:
+    metrics.request(request.endpoint or "unmatched", request.environ.get("effling.started", 0))
+    return response
+
+def metrics_gauges() -> Dict[str, float]:
+    cache = suggestion_cache.stats()
+    current = serving
+    gauges = {"effling_vocabulary_words": len(current.vocab.all_words()), "effling_vocabulary_version": current.version, "effling_cache_entries": cache.get("size", 0)}
+    for name in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        gauges[f"effling_cache_{name}_total"] = cache.get(name, 0)
+    for name, value in offload.stats().items():
+        if name in ("inline", "offloaded", "timeouts", "partial"):
+            gauges[f"effling_offload_{name}_total"] = value
+    table = precomputed.stats()
+    if table["path"]:
+        gauges["effling_precomputed_entries"] = table["entries"]
+        gauges["effling_precomputed_bytes"] = table["bytes"]
+        gauges["effling_precomputed_current"] = int(table["current"])
+        for name in ("hits", "misses", "stale"):
+            gauges[f"effling_precomputed_{name}_total"] = table[name]
+    persistence = analytics_store.persistence()
+    if persistence is not None:
+        gauges["effling_analytics_queue_depth"] = persistence["queued"]
+        for name in ("written", "batches", "dropped", "failed"):
+            gauges[f"effling_analytics_{name}_total"] = persistence[name]
+    return gauges
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    waits = None if isinstance(analytics_store, AnalyticsStore) else analytics_store.lock_waits()
+    return Response(metrics.render(waits, metrics_gauges()), mimetype="text/plain; version=0.0.4")
+
+@app.route("/metrics/profile", methods=["GET"])
+def metrics_profile():
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "profiler disabled; set EFFLING_PROFILER=1"}), 404
+    try:
+        seconds = float(request.args.get("seconds", "10"))
+        interval = max(0.001, float(request.args.get("interval", "0.005")))
+    except ValueError:
+        return jsonify({"error": "seconds and interval must be numbers"}), 400
+    try:
+        folded = profiler.capture(seconds, interval)
+    except RuntimeError as exc:
+        return jsonify({"error": str(exc)}), 409
+    return Response(folded, mimetype="text/plain")
+
+ADMIN_TOKEN = os.environ.get("EFFLING_ADMIN_TOKEN")
+
+def admin_denied() -> Optional[Tuple[Response, int]]:
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "admin API disabled; set EFFLING_ADMIN_TOKEN"}), 403
+    supplied = (request.headers.get("Authorization") or "").removeprefix("Bearer ").strip()
+    if not secrets.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+        return jsonify({"error": "invalid admin token"}), 401
+    return None
+
+EDIT_FIELD_TYPES = {"lang": (str,), "category": (str,), "age_level": (str,), "phonetic": (str,), "frequency": (str, int, float), "difficulty": (int, float), "common_mistakes": (list,)}
+
+def parse_vocabulary_edits(payload: dict) -> Tuple[Dict[str, Dict], List[Tuple[str, str, str]]]:
+    words = payload.get("words") or {}
+    if not isinstance(words, dict) or not all(isinstance(w, str) and w and isinstance(meta, dict) for w, meta in words.items()):
+        raise ValueError("words must map non-empty words to metadata objects")
+    for word, meta in words.items():
+        for field, types in EDIT_FIELD_TYPES.items():
+            value = meta.get(field)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, types)):
+                raise ValueError(f"{word!r}: {field} must be {' or '.join(t.__name__ for t in types)}")
+        if not all(isinstance(cm, dict) and isinstance(cm.get("incorrect"), str) and isinstance(cm.get("error_type") or "", str) for cm in meta.get("common_mistakes") or ()):
+            raise ValueError(f"{word!r}: common_mistakes entries need an incorrect string and a string error_type")
+    mistakes = []
+    for item in payload.get("commonMistakes") or []:
+        if not isinstance(item, dict) or not item.get("word") or not item.get("incorrect"):
+            raise ValueError("commonMistakes entries need word and incorrect")
+        mistakes.append((str(item["word"]), str(item["incorrect"]), str(item.get("errorType") or "common")))
+    return words, mistakes
+
+@app.route("/api/v1/admin/vocabulary", methods=["GET"])
+def api_admin_vocabulary():
+    return admin_denied() or jsonify(reloader.status())
+
+@app.route("/api/v1/admin/vocabulary/reload", methods=["POST"])
+def api_admin_vocabulary_reload():
+    denied = admin_denied()
+    if denied:
+        return denied
+    payload = request.get_json(silent=True) or {}
+    try:
+        words, mistakes = parse_vocabulary_edits(payload)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if reloader.master is not None:
+        if words or mistakes:
+            return jsonify({"error": "edits are per process under --workers; update the vocabulary source and reload"}), 409
+        os.kill(reloader.master, signal.SIGHUP)
+        return jsonify(dict(reloader.status(), building=True)), 202
+    reloader.edit(words, mistakes)
+    wait = bool(payload.get("wait"))
+    return jsonify(reloader.reload(wait=wait)), 200 if wait else 202
+
+@app.route("/api/v1/stats/cache", methods=["GET"])
+def api_stats_cache():
+    return jsonify(dict(suggestion_cache.stats(), offload=offload.stats(), persistence=analytics_store.persistence(), precomputed=precomputed.stats()))
+
+def session_stats(args: Mapping) -> Tuple[int, Dict, bytes]:
+    session_id = session_key(args)
+    found = analytics_store.snapshot(session_id)
+    history = None
+    if args.get("history") not in (None, "", "0", "false"):
+        def as_int(name):
+            try:
+                return int(args[name]) if args.get(name) not in (None, "") else None
+            except ValueError:
+                return None
+        history = analytics_store.history(session_id, args.get("word") or None, as_int("sinceTs"), as_int("untilTs"))
+    if found is None:
+        if history and history["totals"]["total"]:
+            return 200, {"sessionId": session_id, "history": history}, b""
+        return 404, {"error": f"unknown session {session_id!r}"}, b""
+    snap, fragment = found
+    body = dict(snap, sessionId=session_id) if session_id is not None else snap
+    if history is not None:
+        body = dict(body, history=history)
+    return 200, body, fragment
 
 @app.route("/api/v1/stats/session", methods=["GET"])
 def api_stats_session():
-    with analytics_lock:
-        return jsonify({"sessionPoints": analytics["session_points"], "attempts": analytics["attempts"][-50:]})
+    status, body, members = session_stats(request.args)
+    return json_with_members(body, members, status)
+
+ASGI_THREADS = int(os.environ.get("EFFLING_ASGI_THREADS", "8"))
+
+class SingleFlight:
+    def __init__(self):
+        self.calls: Dict[str, asyncio.Future] = {}
+        self.started = self.shared = 0
+
+    async def run(self, key: str, executor, fn, *args):
+        future = self.calls.get(key)
+        if future is not None:
+            self.shared += 1
+            return await asyncio.shield(future)
+        self.started += 1
+        future = self.calls[key] = asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self.calls.get(key) is future:
+                del self.calls[key]
+
+def flight_key(*parts) -> str:
+    return json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+
+class AsyncSpellingApp:
+    def __init__(self, executor: Optional[ThreadPoolExecutor] = None):
+        self.executor = executor or ThreadPoolExecutor(ASGI_THREADS, thread_name_prefix="effling-asgi")
+        self.flights = SingleFlight()
+        self.routes = {("POST", "/api/v1/spelling/validate"): self.validate, ("POST", "/api/v1/spelling/analyze-progress"): self.analyze_progress, ("GET", "/api/v1/stats/session"): self.stats_session}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    self.executor.shutdown(wait=False)
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+        route = self.routes.get((scope["method"], scope["path"]))
+        if route is None:
+            allowed = any(path == scope["path"] for _, path in self.routes)
+            status, data = (405, json_bytes({"error": "method not allowed"})) if allowed else (404, json_bytes({"error": "not found"}))
+        else:
+            try:
+                status, data = await route(scope, receive)
+            except Exception:
+                app.logger.exception("error handling %s %s", scope["method"], scope["path"])
+                status, data = 500, json_bytes({"error": "internal server error"})
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())]})
+        await send({"type": "http.response.body", "body": data})
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def payload(self, scope, receive) -> Tuple[Optional[dict], Optional[Tuple[int, bytes]]]:
+        headers = dict(scope.get("headers") or ())
+        if b"json" not in headers.get(b"content-type", b""):
+            return None, (415, json_bytes({"error": "expected an application/json body"}))
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        try:
+            payload = json.loads(b"".join(chunks)) or {}
+        except ValueError:
+            return None, (400, json_bytes({"error": "invalid JSON body"}))
+        if not isinstance(payload, dict):
+            return None, (400, json_bytes({"error": "expected a JSON object"}))
+        return payload, None
+
+    async def validate(self, scope, receive) -> Tuple[int, bytes]:
+        payload, error = await self.payload(scope, receive)
+        if error:
+            return error
+        raw_word, language, child_profile, query_word = parse_validation(payload)
+        key = flight_key("validate", query_word, language, child_profile.get("ageGroup"))
+        result = await self.flights.run(key, self.executor, evaluate_word, query_word, language, child_profile)
+        body, members = await self.run(validation_response, payload, raw_word, query_word, child_profile, result)
+        return 200, json_bytes(body, members)
+
+    async def analyze_progress(self, scope, receive) -> Tuple[int, bytes]:
+        payload, error = await self.payload(scope, receive)
+        if error:
+            return error
+        if "progressSession" in payload and not (payload.get("expectedWord") or "").strip():
+            status, body = await self.run(keystroke_progress, payload)
+            return status, json_bytes(body)
+        key = flight_key("progress", payload.get("lettersWritten"), payload.get("expectedWord"), payload.get("language"), payload.get("ageGroup"))
+        return 200, json_bytes(await self.flights.run(key, self.executor, progress_body, payload))
+
+    async def stats_session(self, scope, receive) -> Tuple[int, bytes]:
+        args: Dict[str, str] = {}
+        for k, v in parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True):
+            args.setdefault(k, v)
+        status, body, members = await self.run(session_stats, args)
+        return status, json_bytes(body, members)
+
+asgi_app = AsyncSpellingApp()
 
 INDEX_HTML = """
 <!doctype html>
@@ -433,6 +3279,7 @@ INDEX_HTML = """
   const ctx = document.getElementById('liveChart').getContext('2d');
   const chartData = { labels: [], datasets: [{ label:'Accuracy %', data:[], fill:false, tension:0.2, borderWidth:2 }] };
   const liveChart = new Chart(ctx, { type:'line', data: chartData, options:{ plugins:{legend:{display:false}}, scales:{ y:{min:0,max:100}} } });
+  let analyticsCursor = null;
 
   function speak(text, lang='en-US'){
     try {
@@ -474,7 +3321,7 @@ INDEX_HTML = """
     for(const L of letters){
       const r = await fetch('/api/v1/spelling/analyze-progress', {
         method:'POST', headers:{'Content-Type':'application/json'},
-        body: JSON.stringify({ lettersWritten: [L], expectedWord: "" })
+        body: JSON.stringify({ lettersWritten: [L], expectedWord: "", language: 'english', ageGroup: age || null })
       }).then(r=>r.json());
       (r.predictions || []).forEach(p => {
         const word = p.word;
@@ -521,7 +3368,7 @@ INDEX_HTML = """
     // call validate API (server handles spelling analysis)
     const res = await fetch('/api/v1/spelling/validate', {
       method:'POST', headers:{'Content-Type':'application/json'},
-      body: JSON.stringify({ word: wordRaw, language: lang, childProfile: { age:5, ageGroup } })
+      body: JSON.stringify({ word: wordRaw, language: lang, childProfile: { age:5, ageGroup }, cursor: analyticsCursor })
     });
     const j = await res.json();
     // render letters with spelling mistakes
@@ -529,7 +3376,11 @@ INDEX_HTML = """
     // render handwriting confidence panel
     renderHandwritingPanel(wordRaw, confidences);
     renderSuggestions(j.suggestions || [], j.feedback || {});
-    if(j.analytics && j.analytics.sessionPoints) updateChartWith(j.analytics.sessionPoints);
+    if(j.analytics){
+      if(j.analytics.reset){ chartData.labels.length = 0; chartData.datasets[0].data.length = 0; }
+      if(j.analytics.sessionPoints) updateChartWith(j.analytics.sessionPoints);
+      analyticsCursor = j.analytics.cursor;
+    }
     // voice + tone
     if(j.isCorrect){ playTone('correct'); speak(j.feedback.message || `Great!`, lang==='hindi' ? 'hi-IN' : 'en-US'); }
     else { playTone('incorrect'); speak(j.feedback.message || `Try again`, lang==='hindi' ? 'hi-IN' : 'en-US'); }
@@ -543,14 +3394,19 @@ INDEX_HTML = """
       if(m.position_written !== null && m.position_written !== undefined) wrongByPos[m.position_written] = m;
       else if(m.position_correct !== null && m.position_correct !== undefined) missing.push(m.position_correct);
     });
-    for(let i=0;i<written.length;i++){
-      const ch = written[i];
+    // mistake positions are code-point offsets of grapheme clusters, so walk clusters rather than code units
+    const clusters = window.Intl && Intl.Segmenter ? Array.from(new Intl.Segmenter(undefined, {granularity: 'grapheme'}).segment(written), s => s.segment) : Array.from(written);
+    let offset = 0;
+    for(let i=0;i<clusters.length;i++){
+      const ch = clusters[i];
+      const wrong = wrongByPos[offset];
+      offset += Array.from(ch).length;
       const el = document.createElement('span'); el.className='letter';
       // determine confidence color if available
       let conf = confidences && confidences[i] !== undefined ? confidences[i] : null;
-      if(wrongByPos[i]){
+      if(wrong){
         el.classList.add('wrong');
-        el.title = wrongByPos[i].type + (wrongByPos[i].correct ? ' → '+wrongByPos[i].correct : '');
+        el.title = wrong.type + (wrong.correct ? ' → '+wrong.correct : '');
       } else {
         el.classList.add('correct');
       }
@@ -617,29 +3473,49 @@ INDEX_HTML = """
     return confs;
   }
 
+  const live = { session: null, seq: 0, text: "", predictions: [] };
+
+  async function postProgress(body){
+    const res = await fetch('/api/v1/spelling/analyze-progress', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify(body)});
+    return { status: res.status, j: await res.json() };
+  }
+
   async function analyzeLive(){
     const lettersRaw = document.getElementById('liveType').value.trim(); if(!lettersRaw){ alert('Type letters'); return; }
     const letters = lettersRaw.split(/\s+/);
-    const res = await fetch('/api/v1/spelling/analyze-progress', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ lettersWritten: letters, expectedWord: "" })});
-    const j = await res.json();
+    const text = letters.join('');
+    const lang = document.getElementById('langSelect').value || 'english';
+    const ageGroup = document.getElementById('ageSelect').value || null;
+    const body = { progressSession: live.session, seq: live.seq, expectedWord: "", language: lang, ageGroup };
+    if(live.session && text.startsWith(live.text)) body.append = text.slice(live.text.length);
+    else if(live.session && live.text.startsWith(text)) body.backspace = live.text.length - text.length;
+    else body.lettersWritten = letters;
+    let { status, j } = await postProgress(body);
+    if(status === 409){
+      delete body.append; delete body.backspace; body.lettersWritten = letters;
+      ({ status, j } = await postProgress(body));
+    }
+    live.session = j.progressSession; live.seq = j.seq; live.text = j.currentProgress;
+    live.predictions = live.predictions.slice(0, j.predictions.keep).concat(j.predictions.add);
     const h = document.getElementById('liveHints'); h.innerHTML = `<div><strong>Progress:</strong> ${j.currentProgress} <strong>Remaining:</strong> ${j.remainingLetters ? j.remainingLetters.join('') : ''}</div>`;
-    if(j.predictions && j.predictions.length){ const pred = j.predictions.map(p => `<span class="suggestion" onclick="fillWord('${p.word}')">${p.word}</span>`).join(' '); h.innerHTML += `<div style="margin-top:8px;"><strong>Predictions:</strong> ${pred}</div>`; }
+    if(live.predictions.length){ const pred = live.predictions.map(p => `<span class="suggestion" onclick="fillWord('${p.word}')">${p.word}</span>`).join(' '); h.innerHTML += `<div style="margin-top:8px;"><strong>Predictions:</strong> ${pred}</div>`; }
   }
 
   function fillWord(w){ document.getElementById('kidInput').value = w; const confs = generateConfidences(w); renderLettersRow(w, [], true, confs); renderHandwritingPanel(w, confs); }
 
   function updateChartWith(points){
     if(!points || !points.length) return;
-    const pt = points[points.length-1];
-    const label = new Date(pt.ts*1000).toLocaleTimeString();
-    chartData.labels.push(label);
-    chartData.datasets[0].data.push(pt.accuracy);
-    if(chartData.labels.length>40){ chartData.labels.shift(); chartData.datasets[0].data.shift(); }
+    points.forEach(pt => {
+      chartData.labels.push(new Date(pt.ts*1000).toLocaleTimeString());
+      chartData.datasets[0].data.push(pt.accuracy);
+    });
+    while(chartData.labels.length>40){ chartData.labels.shift(); chartData.datasets[0].data.shift(); }
     liveChart.update();
   }
 
   async function loadSession(){
     const s = await fetch('/api/v1/stats/session').then(r=>r.json());
+    analyticsCursor = s.cursor;
     if(s.sessionPoints && s.sessionPoints.length){ s.sessionPoints.forEach(p => { chartData.labels.push(new Date(p.ts*1000).toLocaleTimeString()); chartData.datasets[0].data.push(p.accuracy); }); liveChart.update(); }
   }
   loadSession();
@@ -652,13 +3528,343 @@ INDEX_HTML = """
 def index():
     return render_template_string(INDEX_HTML)
 
+SERVE_HOST = os.environ.get("EFFLING_HOST", "0.0.0.0")
+SERVE_PORT = int(os.environ.get("EFFLING_PORT", "5000"))
+SERVE_WORKERS = int(os.environ.get("EFFLING_WORKERS", "1"))
+
+def _serve_worker(sock: socket.socket, store):
+    global analytics_store
+    if store is not None:
+        analytics_store = store
+    for sig in (signal.SIGHUP, signal.SIGINT):
+        signal.signal(sig, signal.SIG_IGN)
+    reloader.master = os.getppid()
+    host, port = sock.getsockname()[:2]
+    offload.start()
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    server.daemon_threads = False
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if store is None:
+            analytics_store.close()
+
+class PreforkServer:
+    def __init__(self, host: str = SERVE_HOST, port: int = SERVE_PORT, workers: int = SERVE_WORKERS, shared_analytics: bool = True, grace: float = 30.0):
+        self.host, self.port = host, port
+        self.workers = max(1, workers)
+        self.shared_analytics = shared_analytics
+        self.grace = grace
+        self.procs: List = []
+        self.manager = None
+        self.store = None
+        self.sock = None
+        self._reload = self._stop = False
+        self._ctx = multiprocessing.get_context("fork")
+
+    def _spawn(self):
+        proc = self._ctx.Process(target=_serve_worker, args=(self.sock, self.store), daemon=False)
+        proc.start()
+        return proc
+
+    def _retire(self, procs: List):
+        for proc in procs:
+            if proc.is_alive():
+                proc.terminate()
+        deadline = time.monotonic() + self.grace
+        for proc in procs:
+            proc.join(max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                proc.kill()
+                proc.join()
+
+    def reload(self):
+        reload_vocabulary()
+        old, self.procs = self.procs, [self._spawn() for _ in range(self.workers)]
+        self._retire(old)
+
+    def serve_forever(self):
+        if self.shared_analytics:
+            self.manager = AnalyticsManager(ctx=self._ctx)
+            self.manager.start(signal.signal, (signal.SIGINT, signal.SIG_IGN))
+            self.store = self.manager.AnalyticsStore()
+        self.sock = socket.create_server((self.host, self.port), backlog=128)
+        self.sock.set_inheritable(True)
+        def request_reload(*_):
+            self._reload = True
+        def request_stop(*_):
+            self._stop = True
+        signal.signal(signal.SIGHUP, request_reload)
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        self.procs = [self._spawn() for _ in range(self.workers)]
+        try:
+            while not self._stop:
+                time.sleep(0.5)
+                if reloader.interval > 0 and reloader.changed():
+                    self._reload = True
+                if self._reload:
+                    self._reload = False
+                    self.reload()
+                self.procs = [proc if proc.is_alive() else self._spawn() for proc in self.procs]
+        finally:
+            self._retire(self.procs)
+            self.sock.close()
+            if self.manager is not None:
+                self.store.close()
+                self.manager.shutdown()
+
 def open_browser_later():
     try:
         webbrowser.open("http://127.0.0.1:5000")
     except Exception:
         pass
 
-if __name__ == "__main__":
-    print("Starting Effling Kids Spelling Demo at http://127.0.0.1:5000")
+VOWEL_SWAPS = {"a": "e", "e": "i", "i": "e", "o": "u", "u": "o"}
+
+def child_misspelling(word: str, language: Optional[str], rng: random.Random) -> str:
+    subs = [(a, b) for a, b in CHILD_SUBSTITUTIONS.get(language, ()) if a in word]
+    if subs and rng.random() < 0.4:
+        a, b = rng.choice(subs)
+        return word.replace(a, b, 1)
+    clusters = list(grapheme_clusters(word))
+    k = rng.randrange(len(clusters))
+    kind = rng.random()
+    if kind < 0.3 and len(clusters) > 1:
+        del clusters[k]
+    elif kind < 0.5:
+        clusters.insert(k, clusters[k])
+    elif kind < 0.7 and len(clusters) > 1:
+        k = min(k, len(clusters) - 2)
+        clusters[k], clusters[k + 1] = clusters[k + 1], clusters[k]
+    elif clusters[k] in VOWEL_SWAPS:
+        clusters[k] = VOWEL_SWAPS[clusters[k]]
+    else:
+        clusters[k] = rng.choice("abcdefghijklmnopqrstuvwxyz") if word.isascii() else rng.choice([c for c in clusters if c != clusters[k]] or clusters)
+    return "".join(clusters)
+
+def child_corpus(source: Vocabulary, n: int, seed: int = 0) -> List[Tuple[str, str, Optional[str]]]:
+    rng = random.Random(seed)
+    words = source.all_words()
+    corpus = []
+    while len(corpus) < n:
+        word = words[rng.randrange(len(words))]
+        language = source.get(word).get("lang")
+        miss = child_misspelling(word, language, rng)
+        if miss and miss != word:
+            corpus.append((miss, word, language))
+    return corpus
+
+def bench_vocabulary(n: int, seed: int = 0) -> Dict[str, Dict]:
+    data = build_builtin_vocab()
+    for w, meta in synthetic_words(max(0, n - len(data)) + len(data), seed).items():
+        if len(data) >= n:
+            break
+        data.setdefault(w, meta)
+    return data
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+def latency_summary(samples_ns: List[int], elapsed: Optional[float] = None) -> Dict:
+    if not samples_ns:
+        return {"count": 0}
+    ordered = sorted(samples_ns)
+    def pct(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] / 1e6, 4)
+    total = elapsed if elapsed is not None else sum(ordered) / 1e9
+    return {"count": len(ordered), "meanMs": round(sum(ordered) / len(ordered) / 1e6, 4), "p50Ms": pct(0.50), "p95Ms": pct(0.95), "p99Ms": pct(0.99), "maxMs": round(ordered[-1] / 1e6, 4), "throughput": round(len(ordered) / total, 1) if total else None}
+
+def time_calls(fn, calls: List[Tuple]) -> Dict:
+    samples = []
+    clock = time.perf_counter_ns
+    for args in calls:
+        started = clock()
+        fn(*args)
+        samples.append(clock() - started)
+    return latency_summary(samples)
+
+def run_microbenchmarks(sizes: Sequence[int] = (1_000, 10_000, 100_000), queries: int = 500, seed: int = 0) -> Dict:
+    report = {"python": sys.version.split()[0], "queries": queries, "seed": seed, "sizes": []}
+    for n in sizes:
+        started = time.perf_counter()
+        source = Vocabulary(bench_vocabulary(n, seed))
+        build = time.perf_counter() - started
+        corpus = child_corpus(source, queries, seed)
+        suggester = SpellingSuggester(source)
+        analyzer = MistakeAnalyzer(source)
+        rng = random.Random(seed)
+        prefixes = [(w[:rng.randint(1, min(4, len(w)))], lang) for _, w, lang in corpus]
+        report["sizes"].append({
+            "words": len(source.all_words()),
+            "buildSeconds": round(build, 3),
+            "rssBytes": rss_bytes(),
+            "damerau_levenshtein": time_calls(damerau_levenshtein, [(miss, word) for miss, word, _ in corpus]),
+            "get_suggestions": time_calls(suggester.get_suggestions, [(miss, lang) for miss, _, lang in corpus]),
+            "analyze_mistake": time_calls(analyzer.analyze_mistake, [(miss, {"language": lang}) for miss, _, lang in corpus]),
+            "align_and_classify": time_calls(align_and_classify, [(miss, word) for miss, word, _ in corpus]),
+            "prefix_search": time_calls(lambda prefix, lang: source.complete(prefix, language=lang, k=5), prefixes),
+        })
+        del source, suggester, analyzer
+        gc.collect()
+    return report
+
+def classroom_session(rng: random.Random, corpus: List[Tuple[str, str, Optional[str]]], child: int) -> List[Tuple[str, Dict]]:
+    miss, word, language = corpus[rng.randrange(len(corpus))]
+    typed = miss if rng.random() < 0.6 else word
+    sid = f"bench-{child}-{rng.randrange(1 << 30)}"
+    steps = [("keystroke", {"progressSession": sid, "seq": i, "append": ch, "language": language}) for i, ch in enumerate(typed)]
+    steps.append(("validate", {"word": typed, "language": language, "sessionId": f"child-{child}"}))
+    return steps
+
+def run_load_test(url: Optional[str] = None, children: int = 30, duration: float = 10.0, seed: int = 0) -> Dict:
+    corpus = child_corpus(serving.vocab, 2_000, seed)
+    paths = {"keystroke": "/api/v1/spelling/analyze-progress", "validate": "/api/v1/spelling/validate"}
+    samples: Dict[str, List[int]] = {kind: [] for kind in paths}
+    errors = {kind: 0 for kind in paths}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    def child_loop(child: int):
+        rng = random.Random(seed * 1_000_003 + child)
+        client = None if url else app.test_client()
+        mine: Dict[str, List[int]] = {kind: [] for kind in paths}
+        failed = {kind: 0 for kind in paths}
+        while time.monotonic() < deadline:
+            for kind, payload in classroom_session(rng, corpus, child):
+                started = time.perf_counter_ns()
+                try:
+                    if client is not None:
+                        status = client.post(paths[kind], json=payload).status_code
+                    else:
+                        req = urllib.request.Request(url.rstrip("/") + paths[kind], data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"})
+                        with urllib.request.urlopen(req, timeout=30) as resp:
+                            resp.read()
+                            status = resp.status
+                except urllib.error.HTTPError as exc:
+                    status = exc.code
+                except OSError:
+                    status = 0
+                mine[kind].append(time.perf_counter_ns() - started)
+                if status != 200:
+                    failed[kind] += 1
+        with lock:
+            for kind in paths:
+                samples[kind].extend(mine[kind])
+                errors[kind] += failed[kind]
+    started = time.perf_counter()
+    threads = [threading.Thread(target=child_loop, args=(child,), daemon=True) for child in range(children)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    report = {"target": url or "test-client", "children": children, "durationSeconds": round(elapsed, 3), "rssBytes": rss_bytes(), "endpoints": {}}
+    for kind in paths:
+        report["endpoints"][kind] = dict(latency_summary(samples[kind], elapsed), errors=errors[kind])
+    report["overall"] = latency_summary([x for kind in paths for x in samples[kind]], elapsed)
+    return report
+
+def write_report(report: Dict, output: Optional[str]):
+    text = json.dumps(report, ensure_ascii=False)
+    if output:
+        with open(output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    print(text)
+
+def bench_command(args) -> int:
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    write_report(run_microbenchmarks(sizes, args.queries, args.seed), args.output)
+    return 0
+
+def load_test_command(args) -> int:
+    write_report(run_load_test(args.url, args.children, args.duration, args.seed), args.output)
+    return 0
+
+def build_vocab_command(args) -> int:
+    data = read_vocabulary_source(args.source) if args.source else None
+    stats = compile_vocabulary(load_vocabulary(data=data), args.output)
+    print(json.dumps(stats))
+    return 0
+
+def precompute_command(args) -> int:
+    print(json.dumps(build_misspelling_table(serving.vocab, args.output, args.frequency or None)))
+    return 0
+
+def mem_bench_command(args) -> int:
+    print(json.dumps(compare_storage_layouts(args.words)))
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Effling Kids spelling service")
+    commands = parser.add_subparsers(dest="command")
+    serve = commands.add_parser("serve", help="run the demo server (default)")
+    serve.add_argument("--host", default=SERVE_HOST)
+    serve.add_argument("--port", type=int, default=SERVE_PORT)
+    serve.add_argument("--workers", type=int, default=SERVE_WORKERS, help="pre-forked worker processes sharing one vocabulary; SIGHUP reloads it")
+    serve.add_argument("--asgi", action="store_true", help="serve the async /api/v1 app with uvicorn instead of Flask")
+    build = commands.add_parser("build-vocab", help="compile a vocabulary file for EFFLING_VOCAB_FILE")
+    build.add_argument("output")
+    build.add_argument("--source", help="JSON object mapping words to metadata; defaults to the built-in word lists")
+    mem = commands.add_parser("mem-bench", help="compare dict and compact word storage memory")
+    mem.add_argument("--words", type=int, default=100_000)
+    pre = commands.add_parser("precompute", help="build the misspelling table for EFFLING_PRECOMPUTED from the configured vocabulary")
+    pre.add_argument("output")
+    pre.add_argument("--frequency", default=PRECOMPUTE_FREQUENCY, help="only expand words with this frequency; empty for all words")
+    bench = commands.add_parser("bench", help="microbenchmark the hot paths on synthetic vocabularies; prints JSON")
+    bench.add_argument("--sizes", default="1000,10000,100000", help="comma-separated vocabulary sizes")
+    bench.add_argument("--queries", type=int, default=500, help="child misspellings per size")
+    bench.add_argument("--seed", type=int, default=0)
+    bench.add_argument("--output", help="also write the JSON report to this file")
+    load = commands.add_parser("load-test", help="replay classroom keystroke/validate traffic; prints JSON")
+    load.add_argument("--url", help="base URL of a running server; defaults to the in-process Flask test client")
+    load.add_argument("--children", type=int, default=30, help="concurrent simulated children")
+    load.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    load.add_argument("--seed", type=int, default=0)
+    load.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args(argv)
+    if args.command == "build-vocab":
+        return build_vocab_command(args)
+    if args.command == "mem-bench":
+        return mem_bench_command(args)
+    if args.command == "precompute":
+        return precompute_command(args)
+    if args.command == "bench":
+        return bench_command(args)
+    if args.command == "load-test":
+        return load_test_command(args)
+    host = getattr(args, "host", SERVE_HOST)
+    port = getattr(args, "port", SERVE_PORT)
+    workers = getattr(args, "workers", SERVE_WORKERS)
+    if getattr(args, "asgi", False):
+        try:
+            import uvicorn
+        except ImportError:
+            print("serve --asgi needs uvicorn: pip install uvicorn", file=sys.stderr)
+            return 1
+        offload.start()
+        reloader.watch()
+        precomputed.warm(serving.vocab)
+        uvicorn.run(asgi_app, host=host, port=port)
+        return 0
+    if workers > 1:
+        print(f"Starting Effling Kids Spelling service on {host}:{port} with {workers} workers (pid {os.getpid()}, SIGHUP reloads vocabulary)")
+        precomputed.warm(serving.vocab, wait=True)
+        PreforkServer(host, port, workers).serve_forever()
+        return 0
+    offload.start()
+    reloader.watch()
+    precomputed.warm(serving.vocab)
+    print(f"Starting Effling Kids Spelling Demo at http://127.0.0.1:{port}")
     t = threading.Timer(1.0, open_browser_later); t.daemon = True; t.start()
-    app.run(host="0.0.0.0", port=5000, debug=False)
+    app.run(host=host, port=port, debug=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+import json
+import random
+import time
+
+import pytest
+
+import Effling_Spelling_detection_module as spelling
+from Effling_Spelling_detection_module import AGE_LEVELS, AttemptDatabase, INDEX_STRATEGIES, PASSAGE_MAX_TOKEN, CandidateIndex, CompactWordStore, CompiledVocabulary, LRUCache, MistakeAnalyzer, PassageChecker, PointSeries, PrecomputedAnalyses, SessionStats, SessionStore, Vocabulary, VocabularyReloader, align, align_and_classify, build_builtin_vocab, child_misspelling, compile_vocabulary, damerau_levenshtein, damerau_levenshtein_batch, damerau_levenshtein_bounded, edit_distance, grapheme_clusters, likely_variants, passage_tokens, query_form, word_evaluation
+
+ALPHABETS = ("abcde", "कखगमािीुे", "abकि")
+
+def random_word(rng: random.Random, alphabet: str, longest: int = 8) -> str:
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, longest)))
+
+def mutate(rng: random.Random, word: str, alphabet: str) -> str:
+    chars = list(word)
+    for _ in range(rng.randint(0, 3)):
+        op = rng.randrange(4)
+        i = rng.randrange(len(chars) + 1)
+        if op == 0:
+            chars.insert(i, rng.choice(alphabet))
+        elif chars and op == 1:
+            del chars[min(i, len(chars) - 1)]
+        elif chars and op == 2:
+            chars[min(i, len(chars) - 1)] = rng.choice(alphabet)
+        elif len(chars) > 1:
+            i = min(i, len(chars) - 2)
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return "".join(chars)
+
+def word_pairs(seed: int, n: int = 400):
+    rng = random.Random(seed)
+    for _ in range(n):
+        alphabet = rng.choice(ALPHABETS)
+        a = random_word(rng, alphabet)
+        yield a, mutate(rng, a, alphabet) if rng.random() < 0.7 else random_word(rng, alphabet)
+
+def test_reference_known_distances():
+    assert damerau_levenshtein("", "") == 0
+    assert damerau_levenshtein("abc", "") == 3
+    assert damerau_levenshtein("teh", "the") == 1
+    assert damerau_levenshtein("ca", "abc") == 2
+    assert damerau_levenshtein("सेभ", "सेब") == 1
+
+def test_native_distance_matches_reference():
+    for a, b in word_pairs(1):
+        assert edit_distance(a, b) == damerau_levenshtein(a, b), (a, b)
+
+@pytest.mark.parametrize("k", [0, 1, 2, 3])
+def test_bounded_matches_capped_reference(k):
+    for a, b in word_pairs(2 + k):
+        assert damerau_levenshtein_bounded(a, b, k) == min(damerau_levenshtein(a, b), k + 1), (a, b, k)
+
+@pytest.mark.parametrize("k", [None, 0, 1, 2])
+def test_batch_matches_reference(k):
+    rng = random.Random(10)
+    for alphabet in ALPHABETS:
+        query = random_word(rng, alphabet)
+        candidates = [mutate(rng, query, alphabet) for _ in range(50)] + [random_word(rng, alphabet) for _ in range(50)]
+        expected = [damerau_levenshtein(query, c) if k is None else min(damerau_levenshtein(query, c), k + 1) for c in candidates]
+        assert damerau_levenshtein_batch(query, candidates, k) == expected
+
+def build_index(strategy: str, words) -> CandidateIndex:
+    index = INDEX_STRATEGIES[strategy]()
+    for w in words:
+        index.add(w)
+    return index
+
+@pytest.mark.parametrize("alphabet", ALPHABETS)
+@pytest.mark.parametrize("strategy", sorted(INDEX_STRATEGIES))
+def test_index_matches_brute_force(strategy, alphabet):
+    rng = random.Random(ALPHABETS.index(alphabet))
+    words = list(dict.fromkeys(random_word(rng, alphabet, 7) for _ in range(200)))
+    index = build_index(strategy, words)
+    brute = build_index("brute", words)
+    for _ in range(80):
+        query = mutate(rng, rng.choice(words), alphabet) if rng.random() < 0.8 else random_word(rng, alphabet, 12)
+        for k in range(3):
+            expected = {w: d for w in words if (d := damerau_levenshtein(w, query)) <= k}
+            assert index.search(query, k) == expected, (strategy, query, k)
+            assert brute.search(query, k) == expected
+        assert index.nearest(query)[1] == min(damerau_levenshtein(w, query) for w in words)
+
+@pytest.mark.parametrize("strategy", sorted(INDEX_STRATEGIES))
+def test_long_queries_find_nothing(strategy):
+    assert build_index(strategy, ["apple", "apply", "ample"]).search("a" * 200) == {}
+
+def test_passage_tokens_ignore_chunk_boundaries():
+    rng = random.Random(5)
+    pieces = ["a" * (PASSAGE_MAX_TOKEN + 10), "क" * (PASSAGE_MAX_TOKEN + 5), "कम", "\u200c", "ि", "ok", "ab", " ", "!"]
+    for _ in range(2000):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 8)))
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 5))))
+        chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        assert list(passage_tokens(chunks)) == list(passage_tokens([text])), chunks
+    text = "a" * 50 + "कम ok"
+    assert list(passage_tokens([text[:50], text[50:]])) == list(passage_tokens([text]))
+
+def test_lru_cache_generations_and_counters():
+    cache = LRUCache(maxsize=2, ttl=None)
+    cache.put("a", 1, 1)
+    cache.put("b", 2, 1)
+    assert cache.get("a", 1) == 1
+    cache.put("c", 3, 1)
+    assert cache.get("b", 1, None) is None
+    assert cache.get("a", 0, None) is None
+    assert cache.get("a", 1) == 1
+    assert cache.peek("c", 1) and not cache.peek("c", 2)
+    assert cache.get("c", 2, None) is None
+    cache.put("stale", 4, 1)
+    assert cache.get("stale", 2, None) is None
+    stats = cache.stats()
+    assert (stats["size"], stats["hits"], stats["misses"], stats["evictions"], stats["invalidations"]) == (0, 2, 4, 1, 1)
+
+def test_lru_cache_ttl_expiry():
+    cache = LRUCache(maxsize=8, ttl=0.01)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.02)
+    assert cache.get("a", 0, None) is None
+    assert cache.stats()["expirations"] == 1
+
+def test_validate_batch_evaluates_repeats_once(monkeypatch):
+    evaluated = []
+    evaluate = spelling.evaluate_word
+    monkeypatch.setattr(spelling, "evaluate_word", lambda word, *args: evaluated.append(word) or evaluate(word, *args))
+    body = spelling.app.test_client().post("/api/v1/spelling/validate-batch", json={"words": ["becuase", "the", "Becuase", "becuase"], "sessionId": "test-batch-dedup"}).get_json()
+    assert evaluated == ["becuase", "the"]
+    assert [r["writtenWord"] for r in body["results"]] == ["becuase", "the", "Becuase", "becuase"]
+    assert [r["isCorrect"] for r in body["results"]] == [False, True, False, False]
+    assert body["analytics"]["cursor"] == 4
+    assert [p["accuracy"] for p in body["analytics"]["sessionPoints"]] == [0.0, 50.0, 33.3, 25.0]
+
+def test_validate_batch_of_one_matches_validate():
+    client = spelling.app.test_client()
+    single = client.post("/api/v1/spelling/validate", json={"word": "becuase", "sessionId": "test-batch-single"}).get_json()
+    batch = client.post("/api/v1/spelling/validate-batch", json={"words": ["becuase"], "sessionId": "test-batch-one"}).get_json()
+    assert batch["results"] == [{k: v for k, v in single.items() if k != "analytics"}]
+    assert batch["analytics"]["cursor"] == single["analytics"]["cursor"] == 1
+    stream = client.post("/api/v1/spelling/validate-batch", json={"words": ["becuase"], "sessionId": "test-batch-stream", "stream": True}).data.splitlines()
+    assert stream[0] == spelling.json_bytes(batch["results"][0], compact=True).rstrip(b"\n")
+
+def attempt(i: int, correct: bool) -> dict:
+    return {"ts": 1000 + i, "word": f"w{i}", "intended": f"w{i}", "correct": correct}
+
+def test_session_stats_keep_running_totals_over_bounded_history(monkeypatch):
+    monkeypatch.setattr(spelling, "ATTEMPT_HISTORY", 5)
+    stats = SessionStats()
+    outcomes = [i % 3 == 0 for i in range(20)]
+    for i, correct in enumerate(outcomes):
+        stats.record(attempt(i, correct), () if correct else ("wrong_letter",))
+    snap = stats.snapshot()
+    assert snap["totals"] == {"total": 20, "correct": sum(outcomes), "accuracy": round(sum(outcomes) / 20 * 100, 1)}
+    assert snap["errorTypes"] == {"wrong_letter": 20 - sum(outcomes)}
+    assert [a["ts"] for a in snap["attempts"]] == [1015, 1016, 1017, 1018, 1019]
+    assert stats.points[-1]["accuracy"] == snap["totals"]["accuracy"]
+
+def test_session_store_stripes_sessions_and_evicts_idle_ones():
+    store = SessionStore(shards=4, idle_ttl=60)
+    for i in range(40):
+        store.record(f"child-{i}", [attempt(i, i % 2 == 0)], [()])
+    assert len(store) == 40
+    assert sum(1 for sessions, _ in store._shards if sessions) > 1
+    for sessions, _ in store._shards:
+        assert all(store._shards[store._shard(sid)][0] is sessions for sid in sessions)
+    assert store.snapshot("child-3")[0]["totals"] == {"total": 1, "correct": 0, "accuracy": 0.0}
+    for i in range(0, 40, 2):
+        store._shards[store._shard(f"child-{i}")][0][f"child-{i}"].last_seen -= 120
+    store.sweep()
+    assert len(store) == 20 and store.evicted == 20
+    assert store.snapshot("child-0") is None
+    assert store.series("child-0") == b'"sessionPoints":[],"cursor":0'
+    assert store.snapshot("child-1") is not None
+
+def test_point_series_cursor_and_reset():
+    series = PointSeries(maxlen=3)
+    for i in range(5):
+        series.append({"ts": i, "accuracy": i})
+    everything = [{"ts": i, "accuracy": i} for i in (2, 3, 4)]
+    assert series.view(3) == (everything[1:], None, 5, False)
+    assert series.view(5) == ([], None, 5, False)
+    assert series.view(1) == (everything, None, 5, True)
+    assert series.view(9) == (everything, None, 5, True)
+    assert series.view(0) == (everything, None, 5, False)
+    assert series.view(since_ts=2) == (everything[1:], None, 5, False)
+    assert series.view() == (everything, None, 5, False)
+    series.remember(5, b"[cached]")
+    assert series.view() == (None, b"[cached]", 5, False)
+    series.append({"ts": 5, "accuracy": 5})
+    assert series.view()[0] == everything[1:] + [{"ts": 5, "accuracy": 5}]
+
+def test_compiled_vocabulary_matches_in_memory(tmp_path):
+    data = build_builtin_vocab()
+    data["because"]["common_mistakes"] = [{"incorrect": "becoz", "error_type": "common"}]
+    memory = Vocabulary(data)
+    compile_vocabulary(memory, str(tmp_path / "vocab.evb"))
+    compiled = CompiledVocabulary(str(tmp_path / "vocab.evb"))
+    assert len(compiled) == len(memory.all_words())
+    for language in (None, "english", "hindi"):
+        assert list(compiled.all_words(language)) == list(memory.all_words(language))
+        for age in AGE_LEVELS:
+            assert list(compiled.words(language, age)) == list(memory.words(language, age))
+    for w in memory.all_words():
+        assert dict(compiled.get(w)) == dict(memory.get(w))
+        assert compiled.exists(w, age_level="5-6") == memory.exists(w, age_level="5-6")
+    rng = random.Random(3)
+    queries = [child_misspelling(w, memory.get(w)["lang"], rng) for w in rng.sample(list(memory.all_words()), 80)] + ["becoz", "aple", "सेभ"]
+    live, disk = MistakeAnalyzer(memory), MistakeAnalyzer(compiled)
+    for q in queries:
+        for language in (None, "english", "hindi"):
+            assert disk.suggester.rank_candidates(q, language) == live.suggester.rank_candidates(q, language), (q, language)
+            assert disk.analyze_mistake(q, {"language": language, "ageGroup": "5-6"}) == live.analyze_mistake(q, {"language": language, "ageGroup": "5-6"})
+            assert compiled.find_by_phonetic(q, language) == memory.find_by_phonetic(q, language)
+        assert compiled.complete(q[:2], age_level="5-6") == memory.complete(q[:2], age_level="5-6")
+    assert compiled.documented_mistake("because", "becoz") and memory.documented_mistake("because", "becoz")
+    compiled.close()
+
+def test_compact_word_store_round_trips_metadata():
+    data = build_builtin_vocab()
+    data.update({
+        "odd": {"lang": "english", "difficulty": True, "category": 1, "frequency": 1.0, "phonetic": ["OT"], "example_sentence": "custom", "extra": {"x": 1}},
+        "sparse": {"lang": "hindi", "difficulty": 40000},
+        "bare": {},
+    })
+    store = CompactWordStore()
+    for word, meta in data.items():
+        store[word] = meta
+    for word, meta in data.items():
+        record = store[word]
+        assert list(record) == list(meta), word
+        assert all(record[k] == v and type(record[k]) is type(v) for k, v in meta.items()), word
+    store["odd"] = dict(data["odd"], difficulty=3)
+    assert store["odd"]["difficulty"] == 3 and len(store) == len(data)
+
+def test_alignment_reports_one_mistake_per_edit():
+    for a, b in word_pairs(11):
+        distance, mistakes = align(a, b)
+        assert distance == damerau_levenshtein(grapheme_clusters(a), grapheme_clusters(b)), (a, b)
+        assert len(mistakes) == distance, (a, b, mistakes)
+    assert align_and_classify("teh", "the") == [{"position_written": 1, "position_correct": 1, "error_type": "transposition", "written": "eh", "correct": "he"}]
+    assert align_and_classify("the", "the") == []
+
+def test_passage_checker_ignores_chunk_boundaries():
+    checker = PassageChecker(MistakeAnalyzer(Vocabulary(build_builtin_vocab())))
+    text = "I liek to eat aples and the becuase सेभ पानि, " + "a" * (PASSAGE_MAX_TOKEN + 3) + "कम ok teh the"
+    def check(chunks):
+        results = list(checker.check(iter(chunks), {"ageGroup": "5-6"}))
+        del results[-1]["summary"]["seconds"]
+        return results
+    whole = check([text])
+    assert whole[-1]["summary"]["tooLong"] == 1
+    rng = random.Random(9)
+    for _ in range(50):
+        cuts = sorted(rng.sample(range(len(text) + 1), rng.randint(1, 12)))
+        assert check([text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]) == whole
+
+def test_reload_swaps_a_consistent_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(spelling, "serving", spelling.serving)
+    source = tmp_path / "vocab.json"
+    source.write_text(json.dumps({"because": {"lang": "english", "age_level": "5-6", "frequency": "high", "phonetic": "BKS", "common_mistakes": []}}))
+    reloader = VocabularyReloader(compiled_path=None, source_path=str(source), interval=0)
+    before = spelling.serving
+    reloader.edit({"giraffe": {"lang": "english", "age_level": "7-8"}}, [("because", "becoz", "phonetic")])
+    status = reloader.reload(wait=True)
+    after = spelling.serving
+    assert status["last"]["error"] is None and after is not before
+    assert after.version == after.vocab.version == after.analyzer.vocab.version == status["last"]["version"]
+    assert before.version == before.vocab.version == before.analyzer.vocab.version != after.version
+    assert after.vocab.get("giraffe")["phonetic"] == spelling.phonetic_code("giraffe")
+    assert [m["incorrect"] for m in after.vocab.get("because")["common_mistakes"]] == ["becoz"]
+    assert set(reloader.words) == {"giraffe"}
+    reloader.edit({"zebra": {"lang": ["english"]}})
+    status = reloader.reload(wait=True)
+    assert status["last"]["error"] and spelling.serving is after and set(reloader.words) == {"giraffe"}
+    assert reloader.reload(wait=True)["last"]["error"] is None
+    assert spelling.serving is not after and spelling.serving.vocab.exists("giraffe") and not spelling.serving.vocab.exists("zebra")
+
+def test_attempt_database_flush_writes_pending_rows(tmp_path):
+    db = AttemptDatabase(str(tmp_path / "attempts.db"), capacity=100, batch=7, interval=60, block=1)
+    records = [attempt(i, i % 4 == 0) for i in range(20)]
+    db.enqueue(records, [() if r["correct"] else ("phonetic",) for r in records], "child-1")
+    db.enqueue(records[:3], [()] * 3)
+    started = time.monotonic()
+    assert db.flush() and time.monotonic() - started < 5
+    assert (db.written, db.batches, db.dropped, db.failed) == (23, 4, 0, 0)
+    history = db.history(child="child-1")
+    assert history["totals"] == {"total": 20, "correct": 5, "accuracy": 25.0}
+    assert history["errorTypes"] == {"phonetic": 15} and (history["firstTs"], history["lastTs"]) == (1000, 1019)
+    assert db.history()["totals"]["total"] == 3 and db.history(child="child-1", word="w4")["totals"]["correct"] == 1
+
+def test_precomputed_hits_match_live_analysis(tmp_path):
+    builtin = build_builtin_vocab()
+    picked = [w for w, meta in builtin.items() if meta.get("frequency") == "high"]
+    subset = {w: builtin[w] for w in picked[:6] + picked[-6:]}
+    assert {meta["lang"] for meta in subset.values()} == {"english", "hindi"}
+    v = Vocabulary(subset)
+    table = PrecomputedAnalyses(str(tmp_path / "misspellings.bin"))
+    table.refresh(v)
+    assert table.error is None and table.version == v.version and len(table.table) > 0
+    live = MistakeAnalyzer(v)
+    checked = 0
+    for w in v.all_words():
+        meta = v.get(w)
+        language, age = meta.get("lang"), meta.get("age_level")
+        for miss in sorted(likely_variants(query_form(w, language), language, meta))[:8]:
+            if v.exists(miss, language=language, age_level=age):
+                continue
+            expected = word_evaluation(live.suggester.get_suggestions(miss, language, age, 4), live.analyze_mistake(miss, {"language": language, "ageGroup": age}))
+            assert table.lookup(miss, language, age, v) == json.loads(json.dumps(expected))
+            checked += 1
+    assert checked and (table.hits, table.misses, table.stale) == (checked, 0, 0)
+    assert table.lookup("zzzzzz", "english", None, v) is None and table.misses == 1
+    assert table.lookup(miss, language, age, Vocabulary(subset)) is None and table.stale == 1